@@ -3,9 +3,13 @@ Agent Self-Evolution Tool
 让 Agent 可以用这个工具来进化自己的"基因"
 """
 
-from typing import List, Dict, Optional
+import asyncio
+from typing import Awaitable, Callable, List, Dict, Optional, Union
 from dataclasses import dataclass
 
+from spore_llm import LLMResponseCache, as_llm_client, extract_json, is_async_callable, run_sync
+from spore_compact import CompactionConfig, FeedbackCluster, FeedbackCompactor, truncate
+
 
 @dataclass
 class EvolutionFeedback:
@@ -25,6 +29,10 @@ class AgentGene:
     description: str       # 描述
 
 
+# 基因评估器: (基因, 反馈) -> 分数，越高越好；可以是 async 函数
+GeneEvaluator = Callable[[AgentGene, List[EvolutionFeedback]], Union[float, Awaitable[float]]]
+
+
 class AgentSpore:
     """
     Agent 自我进化孢子
@@ -32,7 +40,8 @@ class AgentSpore:
     使用方式:
         from agent_spore import AgentSpore
         
-        spore = AgentSpore(llm_client=your_llm)
+        spore = AgentSpore(llm_client=your_llm)                  # chat(prompt) 客户端
+        spore = AgentSpore(llm_client=openai.OpenAI(), model="gpt-4")
         
         # 方式1: 进化整个 Agent
         new_genes = spore.evolve_agent(
@@ -51,10 +60,32 @@ class AgentSpore:
             feedback=[...],
             goal="涌现出全新的推理模式"
         )
+        
+        # 方式3: 每个基因单独并发进化，评估器把关
+        new_genes = spore.evolve_agent(genes, feedback, per_gene=True)
     """
     
-    def __init__(self, llm_client):
-        self.llm = llm_client
+    def __init__(
+        self,
+        llm_client,
+        cache: Optional[LLMResponseCache] = None,
+        evaluator: Optional[GeneEvaluator] = None,
+        max_concurrency: int = 8,
+        compaction: Optional[CompactionConfig] = None,
+        model: Optional[str] = None
+    ):
+        # llm_client: OpenAI 兼容客户端 (需要 model)、chat(prompt) 客户端或 spore_llm.LLMClient
+        # cache: 未指定时使用内存缓存，确定性请求 (如 LLM 评分) 不重复付费
+        self.llm = as_llm_client(llm_client, cache if cache is not None else LLMResponseCache(), model)
+        # evaluator: 决定是否接受进化结果；逐基因模式下未设置时用 LLM 评分
+        self.evaluator = evaluator
+        self.max_concurrency = max_concurrency
+        # compaction: 近似反馈聚类并装入固定 token 预算后再放进提示词 (见 spore_compact)
+        self.compactor = FeedbackCompactor(compaction) if compaction else None
+    
+    def set_evaluator(self, evaluator: GeneEvaluator):
+        """设置基因评估器 (基因, 反馈) -> 分数；新基因分数高于原基因才被接受"""
+        self.evaluator = evaluator
     
     # ========== 核心进化方法 ==========
     
@@ -63,14 +94,26 @@ class AgentSpore:
         genes: List[AgentGene],
         feedback: List[EvolutionFeedback],
         goal: str = "实现复杂度与规范性更高、能力更强",
-        max_iterations: int = 3
+        max_iterations: int = 3,
+        per_gene: bool = False,
+        max_gene_tokens: int = 1024,
+        min_improvement: float = 0.0
     ) -> List[AgentGene]:
         """
         进化整个 Agent 的所有基因
         
+        Args:
+            per_gene: 每个基因单独发一次请求并发进化 (JSON 输出)，每个新基因由评估器
+                      打分，高于原基因 min_improvement 以上才接受；不被接受的基因停止迭代
+            max_gene_tokens: 逐基因模式下每次进化回复的 token 上限
+        
         Returns:
             进化后的新基因列表
         """
+        if per_gene:
+            return run_sync(self.aevolve_genes(
+                genes, feedback, goal, max_iterations, max_gene_tokens, min_improvement
+            ))
         
         # 构建进化上下文
         context = self._build_evolution_context(genes, feedback, goal)
@@ -86,8 +129,12 @@ class AgentSpore:
                 iteration=i+1
             )
             
+            if new_genes is current_genes:
+                print(f"⚠️ Iteration {i+1}: 无法解析进化结果，保留原基因")
+                break
+            
             # 评估新基因
-            if self._evaluate_genes(new_genes, feedback):
+            if self._evaluate_genes(new_genes, feedback, baseline=current_genes):
                 current_genes = new_genes
                 print(f"✅ Iteration {i+1}: 进化成功!")
             else:
@@ -96,6 +143,50 @@ class AgentSpore:
         
         return current_genes
     
+    async def aevolve_genes(
+        self,
+        genes: List[AgentGene],
+        feedback: List[EvolutionFeedback],
+        goal: str = "实现复杂度与规范性更高、能力更强",
+        max_iterations: int = 3,
+        max_gene_tokens: int = 1024,
+        min_improvement: float = 0.0
+    ) -> List[AgentGene]:
+        """
+        逐基因并发进化 (evolve_agent(per_gene=True) 的异步版本)
+        
+        每个基因每轮一次进化请求 + 一次评估，各基因之间互不等待；
+        某个基因的新版本未被接受 (或回复无法解析) 时，该基因保留当前版本并停止迭代。
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        feedback_text = self._format_feedback(feedback)
+        
+        async def evolve_one(index: int) -> AgentGene:
+            gene = genes[index]
+            score = await self._score_gene(gene, feedback, semaphore)
+            if score is None:
+                # 原基因评分失败时重评一次；仍失败则无法把关，保留原基因
+                score = await self._score_gene(gene, feedback, semaphore)
+            if score is None:
+                print(f"⚠️ {gene.name}: 原基因评分失败，无法比较，保留原基因")
+                return gene
+            for i in range(max_iterations):
+                candidate = await self._generate_gene(
+                    gene, genes, feedback_text, goal, i + 1, max_gene_tokens, semaphore
+                )
+                if candidate is None:
+                    print(f"⚠️ {gene.name} iteration {i+1}: 无法解析进化结果，保留原基因")
+                    break
+                candidate_score = await self._score_gene(candidate, feedback, semaphore)
+                if candidate_score is None or candidate_score <= score + min_improvement:
+                    print(f"⚠️ {gene.name} iteration {i+1}: 进化效果不佳 ({candidate_score} ≤ {score})，保留原基因")
+                    break
+                print(f"✅ {gene.name} iteration {i+1}: 进化成功! ({score} → {candidate_score})")
+                gene, score = candidate, candidate_score
+            return gene
+        
+        return list(await asyncio.gather(*(evolve_one(i) for i in range(len(genes)))))
+    
     def evolve_gene(
         self,
         gene: AgentGene,
@@ -160,10 +251,17 @@ class AgentSpore:
     ) -> str:
         """构建进化上下文"""
         
-        genes_desc = "\n".join([
-            f"- {g.name}: {g.description}\n  当前: {g.current[:200]}..."
-            for g in genes
-        ])
+        if self.compactor is None:
+            genes_desc = "\n".join([
+                f"- {g.name}: {g.description}\n  当前: {g.current[:200]}..."
+                for g in genes
+            ])
+        else:
+            gene_chars = self.compactor.config.gene_chars
+            genes_desc = "\n".join([
+                f"- {g.name}: {g.description}\n  当前: {truncate(g.current, gene_chars)}"
+                for g in genes
+            ])
         
         feedback_desc = self._format_feedback(feedback)
         
@@ -179,9 +277,10 @@ class AgentSpore:
 """
     
     def _format_feedback(self, feedback: List[EvolutionFeedback]) -> str:
-        """格式化反馈"""
-        return "\n".join([
-            f"""
+        """格式化反馈；设置了 compaction 时先聚类去重并装入 token 预算"""
+        if self.compactor is None:
+            return "\n".join([
+                f"""
 ### 反馈 {i+1}
 - 任务: {f.task}
 - 期望: {f.expected}
@@ -189,8 +288,108 @@ class AgentSpore:
 - 问题: {f.problem}
 - 严重程度: {f.severity}/5
 """
-            for i, f in enumerate(feedback)
-        ])
+                for i, f in enumerate(feedback)
+            ])
+        return self.compactor.compact(feedback, self._render_cluster)
+    
+    def _render_cluster(self, index: int, cluster: FeedbackCluster) -> str:
+        """一类近似反馈的代表条目"""
+        f = cluster.representative
+        limit = self.compactor.config.max_field_chars
+        repeated = f"- 类似反馈: {cluster.count} 条\n" if cluster.count > 1 else ""
+        return f"""
+### 反馈 {index+1}
+- 任务: {truncate(f.task, limit)}
+- 期望: {truncate(f.expected, limit)}
+- 实际: {truncate(f.actual, limit)}
+- 问题: {truncate(f.problem, limit)}
+- 严重程度: {cluster.max_severity}/5
+{repeated}"""
+    
+    async def _generate_gene(
+        self,
+        gene: AgentGene,
+        genes: List[AgentGene],
+        feedback_text: str,
+        goal: str,
+        iteration: int,
+        max_tokens: int,
+        semaphore: asyncio.Semaphore
+    ) -> Optional[AgentGene]:
+        """单个基因的一次进化请求；回复不是合法 JSON 或缺少 current 时返回 None"""
+        
+        others = "\n".join(f"- {g.name}: {g.description}" for g in genes if g.name != gene.name)
+        prompt = f"""你是 Agent 基因进化引擎。请在第 {iteration} 轮迭代中进化下面这一个基因。
+
+## 要进化的基因: {gene.name}
+描述: {gene.description}
+```
+{gene.current}
+```
+
+## Agent 的其他基因 (不要改写，只需保持配合)
+{others or "(无)"}
+
+## 反馈
+{feedback_text}
+
+## 进化目标
+{goal}
+
+## 输出格式
+只输出一个 JSON 对象，不要其他内容:
+{{"current": "进化后的基因内容", "rationale": "一句话说明改了什么"}}
+"""
+        async with semaphore:
+            response = await self.llm.acomplete([{"role": "user", "content": prompt}], max_tokens=max_tokens)
+        data = extract_json(response.text)
+        if not isinstance(data, dict) or not isinstance(data.get("current"), str) or not data["current"].strip():
+            return None
+        return AgentGene(name=gene.name, current=data["current"].strip(), description=gene.description)
+    
+    async def _score_gene(
+        self,
+        gene: AgentGene,
+        feedback: List[EvolutionFeedback],
+        semaphore: asyncio.Semaphore
+    ) -> Optional[float]:
+        """
+        用评估器给基因打分，并发数受 semaphore (max_concurrency) 限制；
+        评估器为 async 函数时直接 await，否则放到线程池执行
+        """
+        if self.evaluator is None:
+            return await self._judge_gene(gene, feedback, semaphore)
+        async with semaphore:
+            if is_async_callable(self.evaluator):
+                return await self.evaluator(gene, feedback)
+            return await asyncio.get_running_loop().run_in_executor(None, self.evaluator, gene, feedback)
+    
+    async def _judge_gene(
+        self,
+        gene: AgentGene,
+        feedback: List[EvolutionFeedback],
+        semaphore: asyncio.Semaphore
+    ) -> Optional[float]:
+        """默认评估器: LLM 按反馈给基因打 0-10 分 (temperature=0，结果可缓存)"""
+        prompt = f"""你是 Agent 基因评审专家。请评估下面的基因能在多大程度上解决反馈中的问题，打 0-10 分。
+
+## 基因: {gene.name}
+描述: {gene.description}
+```
+{gene.current}
+```
+
+## 反馈
+{self._format_feedback(feedback)}
+
+只输出 JSON: {{"score": 分数}}"""
+        async with semaphore:
+            response = await self.llm.acomplete([{"role": "user", "content": prompt}], temperature=0)
+        data = extract_json(response.text)
+        try:
+            return min(max(float(data["score"]), 0.0), 10.0)
+        except (TypeError, KeyError, ValueError):
+            return None
     
     def _generate_evolved_genes(
         self,
@@ -256,21 +455,34 @@ class AgentSpore:
         if not evolved_genes:
             return genes
         
+        # 解析结果不含描述，按基因名沿用原描述
+        descriptions = {g.name: g.description for g in genes}
+        for gene in evolved_genes:
+            gene.description = descriptions.get(gene.name, '')
+        
         return evolved_genes
     
     def _evaluate_genes(
         self,
         genes: List[AgentGene],
-        feedback: List[EvolutionFeedback]
+        feedback: List[EvolutionFeedback],
+        baseline: Optional[List[AgentGene]] = None
     ) -> bool:
         """
         评估进化后的基因是否有改进
-        这里可以调用 LLM 来判断
+        
+        设置了评估器时，新基因的平均分须高于 baseline；未设置时总是接受 (兼容旧行为)
         """
+        if self.evaluator is None or baseline is None:
+            return True
+        
+        async def mean_score(candidates: List[AgentGene]) -> float:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            scores = await asyncio.gather(*(self._score_gene(g, feedback, semaphore) for g in candidates))
+            scores = [s for s in scores if s is not None]
+            return sum(scores) / len(scores) if scores else float("-inf")
         
-        # 简化版本：总是接受进化结果
-        # 实际可以设计更复杂的评估逻辑
-        return True
+        return run_sync(mean_score(genes)) > run_sync(mean_score(baseline))
 
 
 # ========== 便捷函数 ==========
@@ -3,24 +3,60 @@ Prompt Spore - Core Evolution Engine
 让提示词像孢子一样进化
 """
 
-import json
+import asyncio
+import math
 import random
-from typing import List, Dict, Optional, Callable
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Callable, Tuple, Iterator, AsyncIterator
 from dataclasses import dataclass, field
 from datetime import datetime
 
+import numpy as np
+
+from spore_cache import FitnessCache, make_cache_key
+from spore_racing import RacingConfig, race_population
+from spore_sampling import TestCaseSampler
+from spore_matrix import ScoreMatrix, make_rng, top_k, tournament, lexicase
+from spore_lineage import LineageStore
+from spore_stats import EvolutionStats, GenerationStats
+from spore_checkpoint import Checkpointer
+from spore_metrics import EvolutionHooks, EvolutionMetrics
+from spore_budget import EvolutionBudget, BudgetScheduler
+from spore_similarity import DedupConfig, NearDuplicateIndex
+from spore_surrogate import SurrogateConfig, FitnessSurrogate
+from spore_pareto import MultiObjectiveConfig, nsga2_select, pareto_front_2d
+from spore_operators import AdaptiveOperatorSelector, MutationStrategy, OperatorSelectionConfig, default_local_operators
+from spore_pipeline import PipelineConfig, GenerationPipeline
+from spore_llm import LLMClient, LLMResponseCache, AIMDLimiter, create_llm_client, extract_json, is_async_callable, run_sync
+
 
 @dataclass
 class PromptVariant:
     """提示词变体"""
     content: str
     fitness: float = 0.0
+    evaluated: bool = False
+    num_cases: int = 0                                   # 参与评估的测试用例数
+    fitness_ci: Optional[Tuple[float, float]] = None     # 适应度置信区间 (竞速评估时给出)
     generation: int = 0
-    parent: Optional[str] = None
+    id: Optional[int] = None                             # 谱系 ID (登记到 LineageStore 时分配)
+    parent_id: Optional[int] = None
     mutations: List[str] = field(default_factory=list)
     metadata: Dict = field(default_factory=dict)
 
 
+@dataclass
+class GenerationSnapshot:
+    """evolve_iter() 每代产出的快照"""
+    generation: int
+    best: PromptVariant
+    stats: GenerationStats
+    population: List[PromptVariant]
+    stop_reason: Optional[str] = None
+
+
 @dataclass
 class TestCase:
     """测试用例"""
@@ -29,15 +65,6 @@ class TestCase:
     weight: float = 1.0
 
 
-class MutationStrategy:
-    """变异策略基类"""
-    
-    name: str = "base"
-    
-    def mutate(self, prompt: str) -> str:
-        raise NotImplementedError
-
-
 class PromptSpore:
     """提示词孢子进化引擎"""
     
@@ -48,17 +75,68 @@ class PromptSpore:
         base_url: Optional[str] = None,
         population_size: int = 10,
         mutation_rate: float = 0.3,
+        fitness_cache: Optional[FitnessCache] = None,
+        max_concurrency: int = 1,
+        racing: Optional[RacingConfig] = None,
+        sampler: Optional[TestCaseSampler] = None,
+        selection: str = "top_k",
+        per_case: bool = False,
+        pipeline: Optional[PipelineConfig] = None,
+        dedup: Optional[DedupConfig] = None,
+        surrogate: Optional[SurrogateConfig] = None,
+        multi_objective: Optional[MultiObjectiveConfig] = None,
+        operator_selection: Optional[OperatorSelectionConfig] = None,
     ):
         self.model = model
         self.api_key = api_key
         self.base_url = base_url
         self.population_size = population_size
         self.mutation_rate = mutation_rate
+        self.max_concurrency = max_concurrency
+        self.racing = racing
+        self.sampler = sampler
+        self.selection = selection
+        self.per_case = per_case
+        # 流水线繁殖: 变异并发、子代完成即评估 (见 spore_pipeline)
+        self.pipeline = pipeline
+        # 近重复检测: 与已评估个体近似的变体沿用其适应度或重新变异 (见 spore_similarity)
+        self.dedup = dedup
+        self.similarity = NearDuplicateIndex(dedup.threshold, dedup.num_perm, dedup.bands) if dedup else None
+        # 代理适应度模型: 多生成候选，只把预测最好的送去真实评估 (见 spore_surrogate)
+        self.surrogate = FitnessSurrogate(surrogate) if surrogate else None
+        # 多目标: 适应度 ↑ 与 token 数 ↓，默认改用 NSGA-II 选择 (见 spore_pareto)
+        self.multi_objective = multi_objective
+        self._count_tokens = multi_objective.counter() if multi_objective else None
+        self._token_counts: Dict[str, int] = {}
+        if multi_objective and selection == "top_k":
+            self.selection = "nsga2"
+        # 自适应算子选择: 按观测到的适应度增益调整各变异策略被选中的概率 (见 spore_operators)
+        self.operator_selector = AdaptiveOperatorSelector(operator_selection) if operator_selection else None
+        self._operator_credit: Dict[int, Tuple[str, float, float]] = {}
         
         self.population: List[PromptVariant] = []
-        self.history: List[PromptVariant] = []
+        self.history = LineageStore()
+        self.stats = EvolutionStats()
+        self.best_variant: Optional[PromptVariant] = None
+        # 已选出父代、尚未执行的繁殖 (精英, 父代, 变异次数上限)，在下一代开始时执行
+        self._pending_reproduction: Optional[Tuple[PromptVariant, List[PromptVariant], Optional[int]]] = None
+        self._checkpointer: Optional[Checkpointer] = None
+        
+        # 事件钩子与分阶段计量
+        self.hooks: List[EvolutionHooks] = []
+        self.metrics = EvolutionMetrics()
+        
+        # 最近一次带预算运行的花费报告
+        self.budget_report: Optional[Dict] = None
         self.llm_client = None
         
+        # 适应度缓存: 克隆和重复出现的提示词不再重复评估
+        self.fitness_cache = fitness_cache if fitness_cache is not None else FitnessCache()
+        self.evaluator_id: Optional[str] = None
+        
+        # 变体 × 测试用例 分数矩阵 (逐用例评估时填充)
+        self.score_matrix = ScoreMatrix()
+        
         # 内置变异策略
         self.mutation_strategies: List[MutationStrategy] = []
     
@@ -70,144 +148,771 @@ class PromptSpore:
         """添加变异策略"""
         self.mutation_strategies.append(strategy)
     
+    def add_hook(self, hook: EvolutionHooks):
+        """添加事件钩子 (on_generation_start / on_evaluate / on_mutate / on_select / on_generation_end)"""
+        self.hooks.append(hook)
+    
+    def _emit(self, event: str, *args):
+        for hook in self.hooks:
+            handler = getattr(hook, event, None)
+            if handler is not None:
+                handler(self, *args)
+    
+    def _spawn(self, parent: PromptVariant, generation: int) -> PromptVariant:
+        """用随机选中的变异策略从 parent 产生一个子代并登记谱系"""
+        strategy = self._pick_strategy()
+        content, elapsed = self._mutate_content(strategy, parent)
+        return self._register_child(parent, generation, strategy, content, elapsed)
+    
+    def _pick_strategy(self) -> Optional[MutationStrategy]:
+        if self.operator_selector:
+            return self.operator_selector.choose(self.mutation_strategies)
+        return random.choice(self.mutation_strategies) if self.mutation_strategies else None
+    
+    def _offer_mates(self, parents: List[PromptVariant]):
+        """把本代父代提供给交叉类策略 (定义了 set_mates 的策略) 作为另一父代"""
+        contents = [p.content for p in parents]
+        for strategy in self.mutation_strategies:
+            set_mates = getattr(strategy, "set_mates", None)
+            if set_mates is not None:
+                set_mates(contents)
+    
+    def _credit_operators(self):
+        """本代评估完成后，把子代相对父代的适应度增益记给产生它的策略"""
+        for variant in self.population:
+            credit = self._operator_credit.pop(variant.id, None)
+            if credit is not None and variant.evaluated:
+                name, parent_fitness, cost = credit
+                self.operator_selector.update(name, variant.fitness - parent_fitness, cost)
+        self._operator_credit.clear()
+    
+    def _mutate_content(self, strategy: Optional[MutationStrategy], parent: PromptVariant) -> Tuple[str, float]:
+        """执行变异，返回 (新内容, 耗时)；可在工作线程中调用"""
+        start = time.perf_counter()
+        if strategy:
+            mutated_content = strategy.mutate(parent.content)
+            self.metrics.count(f"mutations.{strategy.name}")
+        else:
+            mutated_content = parent.content  # 默认不变异
+        elapsed = time.perf_counter() - start
+        self.metrics.add_time("mutate", elapsed)
+        return mutated_content, elapsed
+    
+    def _register_child(
+        self,
+        parent: PromptVariant,
+        generation: int,
+        strategy: Optional[MutationStrategy],
+        content: str,
+        elapsed: float
+    ) -> PromptVariant:
+        """登记子代谱系并触发 on_mutate (只在主线程调用)"""
+        child = PromptVariant(
+            content=content,
+            generation=generation,
+            parent_id=parent.id,
+            mutations=[strategy.name] if strategy else ["none"]
+        )
+        self.history.add(child)
+        if self.operator_selector and strategy and parent.evaluated:
+            self._operator_credit[child.id] = (strategy.name, parent.fitness, getattr(strategy, "cost", 1.0))
+        self._emit("on_mutate", parent, child, elapsed)
+        return child
+    
     def create_initial_population(self, seed_prompt: str, num_variants: int = None):
         """创建初始种群"""
         if num_variants is None:
             num_variants = self.population_size
         
         # 第一个是原始种子
-        self.population.append(PromptVariant(
+        seed = PromptVariant(
             content=seed_prompt,
             generation=0,
-            parent=None,
+            parent_id=None,
             mutations=["seed"]
-        ))
+        )
+        self.history.add(seed)
+        self.population.append(seed)
         
         # 生成变体
         for i in range(num_variants - 1):
-            strategy = random.choice(self.mutation_strategies) if self.mutation_strategies else None
-            
-            if strategy:
-                mutated = strategy.mutate(seed_prompt)
-            else:
-                mutated = seed_prompt  # 默认不变异
-            
-            variant = PromptVariant(
-                content=mutated,
-                generation=0,
-                parent=seed_prompt,
-                mutations=[strategy.name] if strategy else ["none"]
-            )
-            self.population.append(variant)
+            self.population.append(self._spawn(seed, generation=0))
     
     def evaluate(self, prompt: str, test_cases: List[TestCase]) -> float:
         """评估提示词 - 需要子类实现或设置自定义评估函数"""
         raise NotImplementedError("请设置自定义评估函数: spore.evaluate = my_eval_func")
     
-    def set_evaluator(self, evaluator: Callable):
-        """设置自定义评估函数"""
+    def set_evaluator(self, evaluator: Callable, name: Optional[str] = None):
+        """
+        设置自定义评估函数
+        
+        Args:
+            evaluator: 评估函数 (prompt, test_cases) -> float
+            name: 评估器标识，作为缓存键的一部分；不同配置的评估器应使用不同的 name
+        """
         self.evaluate = evaluator
+        self.evaluator_id = name or "%s.%s" % (
+            getattr(evaluator, "__module__", ""),
+            getattr(evaluator, "__qualname__", repr(evaluator)),
+        )
+    
+    def _get_evaluator_id(self) -> str:
+        if self.evaluator_id:
+            return self.evaluator_id
+        return "%s.%s" % (type(self).__module__, type(self).__qualname__)
+    
+    def evaluate_variant(self, variant: PromptVariant, test_cases: List[TestCase]) -> float:
+        """评估单个变体 (优先读缓存)"""
+        self.evaluate_population([variant], test_cases)
+        return variant.fitness
+    
+    def evaluate_population(self, variants: List[PromptVariant], test_cases: List[TestCase]):
+        """
+        评估一批变体
+        
+        先查缓存，相同内容只评估一次；其余按 max_concurrency 并发评估。
+        同步评估函数在线程池中运行，async 评估函数在事件循环中运行。
+        结果按输入顺序写回，与完成顺序无关。
+        """
+        pending = [v for v in variants if not v.evaluated]
+        if not pending:
+            return
+        
+        if self.per_case:
+            self.evaluate_cases(pending, test_cases, test_cases)
+            return
+        
+        scores = self.score_jobs([(v.content, test_cases) for v in pending])
+        
+        for variant, fitness in zip(pending, scores):
+            variant.fitness = fitness
+            variant.evaluated = True
+            variant.num_cases = len(test_cases)
+    
+    def fill_scores(self, contents: List[str], cases: List[TestCase]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        逐用例评估，补齐分数矩阵中 contents × cases 尚缺的格子
+        
+        Returns:
+            (行号, 列号)
+        """
+        rows = self.score_matrix.rows_for(contents)
+        cols = self.score_matrix.cols_for(cases)
+        miss_rows, miss_cols = self.score_matrix.missing(rows, cols)
+        
+        if len(miss_rows):
+            row_content = {r: c for c, r in zip(contents, rows)}
+            col_case = {c: case for case, c in zip(cases, cols)}
+            jobs = [(row_content[r], [col_case[c]]) for r, c in zip(miss_rows, miss_cols)]
+            self.score_matrix.record(miss_rows, miss_cols, self.score_jobs(jobs))
+        
+        return rows, cols
+    
+    def evaluate_cases(self, variants: List[PromptVariant], cases: List[TestCase], fitness_cases: List[TestCase]):
+        """
+        在 cases 上逐用例评估变体，适应度取 fitness_cases 中已评估用例的加权均值
+        """
+        contents = list(dict.fromkeys(v.content for v in variants))
+        self.fill_scores(contents, cases)
+        
+        rows = self.score_matrix.rows_for(contents)
+        cols = self.score_matrix.cols_for(fitness_cases)
+        fitness = self.score_matrix.fitness(rows, cols)
+        counts = self.score_matrix.counts(rows, cols)
+        by_content = {c: (f, n) for c, f, n in zip(contents, fitness, counts)}
+        
+        for variant in variants:
+            f, n = by_content[variant.content]
+            if n == 0:
+                continue
+            variant.fitness = float(f)
+            variant.evaluated = True
+            variant.num_cases = int(n)
+    
+    def score_jobs(self, jobs: List[Tuple[str, List[TestCase]]]) -> List[float]:
+        """
+        对一组 (提示词, 测试用例) 打分，返回与 jobs 一一对应的分数
+        
+        命中缓存的直接返回，重复的 job 只评估一次。
+        """
+        evaluator_id = self._get_evaluator_id()
+        scores: List[Optional[float]] = [None] * len(jobs)
+        pending: Dict[str, List[int]] = {}
+        
+        for i, (prompt, cases) in enumerate(jobs):
+            key = make_cache_key(prompt, cases, evaluator_id)
+            if key in pending:
+                pending[key].append(i)
+                continue
+            scores[i] = self.fitness_cache.get(key)
+            if scores[i] is None:
+                pending[key] = [i]
+            else:
+                self.metrics.count("cache_hits")
+        
+        if pending:
+            keys = list(pending)
+            results = self._run_evaluations([jobs[pending[k][0]] for k in keys])
+            for key, fitness in zip(keys, results):
+                self.fitness_cache.put(key, fitness)
+                for i in pending[key]:
+                    scores[i] = fitness
+        
+        return scores
+    
+    def _run_evaluations(self, jobs: List[Tuple[str, List[TestCase]]]) -> List[float]:
+        """调用评估函数，返回与 jobs 一一对应的分数"""
+        self.metrics.count("evaluator_calls", len(jobs))
+        if is_async_callable(self.evaluate):
+            return run_sync(self._gather_evaluations(jobs))
+        
+        workers = min(self.max_concurrency, len(jobs))
+        if workers <= 1:
+            return [self.evaluate(p, cases) for p, cases in jobs]
+        
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda job: self.evaluate(*job), jobs))
+    
+    async def _gather_evaluations(self, jobs: List[Tuple[str, List[TestCase]]]) -> List[float]:
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+        
+        async def run(p: str, cases: List[TestCase]) -> float:
+            async with semaphore:
+                return await self.evaluate(p, cases)
+        
+        return list(await asyncio.gather(*(run(p, cases) for p, cases in jobs)))
     
     def select_parents(self, num_parents: int = 3) -> List[PromptVariant]:
-        """基于适应度选择父代 - 轮盘赌选择"""
+        """
+        选择父代
+        
+        selection:
+            top_k      - 适应度前 N 名 (argpartition，不整体排序)
+            tournament - 锦标赛选择
+            lexicase   - 基于逐用例分数的 lexicase 选择 (需要 per_case / racing / sampler 模式)
+            nsga2      - 按 (适应度, token 数) 的非支配排序和拥挤距离 (需要 multi_objective)
+        """
         if not self.population:
             return []
         
-        # 按适应度排序
-        sorted_pop = sorted(self.population, key=lambda x: x.fitness, reverse=True)
+        fitness = np.fromiter((v.fitness for v in self.population), dtype=float, count=len(self.population))
+        
+        if self.selection == "tournament":
+            idx = tournament(fitness, num_parents, rng=make_rng())
+        elif self.selection == "lexicase":
+            if not (self.per_case or self.racing or self.sampler):
+                raise ValueError("lexicase 选择需要 per_case / racing / sampler 模式 (逐用例分数)")
+            rows = self.score_matrix.rows_for([v.content for v in self.population])
+            idx = lexicase(self.score_matrix.scores[rows], num_parents, rng=make_rng())
+        elif self.selection == "nsga2":
+            if not self._count_tokens:
+                raise ValueError("nsga2 选择需要 multi_objective 配置")
+            tokens = np.fromiter((self.count_tokens(v.content) for v in self.population),
+                                 dtype=float, count=len(self.population))
+            idx = nsga2_select(np.column_stack([-fitness, tokens]), num_parents)
+        elif self.selection == "top_k":
+            idx = top_k(fitness, num_parents)
+        else:
+            raise ValueError(f"未知的选择算子: {self.selection}")
         
-        # 选择 top N
-        return sorted_pop[:num_parents]
+        return [self.population[i] for i in idx]
     
     def mutate(self, parent: PromptVariant) -> PromptVariant:
         """对父代进行变异"""
-        strategy = random.choice(self.mutation_strategies) if self.mutation_strategies else None
-        
-        if strategy:
-            mutated_content = strategy.mutate(parent.content)
-        else:
-            mutated_content = parent.content
-        
-        return PromptVariant(
-            content=mutated_content,
-            generation=parent.generation + 1,
-            parent=parent.content,
-            mutations=[strategy.name] if strategy else ["none"]
-        )
+        return self._spawn(parent, generation=parent.generation + 1)
     
     def evolve(
         self,
         prompt: str,
         test_cases: List[TestCase],
         generations: int = 5,
-        verbose: bool = True
+        verbose: bool = True,
+        checkpoint: Optional[str] = None,
+        budget: Optional[EvolutionBudget] = None
     ) -> str:
-        """运行进化主循环"""
+        """
+        运行进化主循环
+        
+        Args:
+            checkpoint: 检查点文件路径；每代结束追加一条增量，可用 resume() 续跑
+            budget: token / 调用次数 / 墙钟时间预算与收敛判定；
+                    generations 仍是上限，花费报告见 self.budget_report
+        """
+        for _ in self.evolve_iter(prompt, test_cases, generations, verbose, checkpoint, budget):
+            pass
+        return self.best_variant.content if self.best_variant else prompt
+    
+    def evolve_iter(
+        self,
+        prompt: str,
+        test_cases: List[TestCase],
+        generations: int = 5,
+        verbose: bool = True,
+        checkpoint: Optional[str] = None,
+        budget: Optional[EvolutionBudget] = None
+    ) -> Iterator[GenerationSnapshot]:
+        """
+        逐代进化的生成器，参数同 evolve()
+        
+        每代评估、选出父代 (检查点已写入) 后产出一个 GenerationSnapshot。下一代的繁殖推迟到
+        生成器被继续迭代时才进行，调用方 break 即停止，不会再为后续的代付出变异和评估开销；
+        之后再次 evolve() / resume() 时先完成这次推迟的繁殖。
+        
+        使用:
+            for snap in spore.evolve_iter(prompt, cases, generations=20):
+                if snap.best.fitness >= 0.9:
+                    break
+        """
+        
+        checkpointer = None
+        if checkpoint:
+            checkpointer = self._checkpointer
+            if checkpointer is None or checkpointer.path != checkpoint:
+                checkpointer = Checkpointer(checkpoint)
+                if checkpointer.exists():
+                    raise ValueError(f"检查点文件已存在，请用 resume() 续跑: {checkpoint}")
+                self._checkpointer = checkpointer
+            checkpointer.attach(self)
+        
+        # 预算从创建初始种群之前开始计: 初始变异计入花费，也作为每次变异花费的初始估计
+        scheduler = None
+        if budget:
+            scheduler = BudgetScheduler(budget, self.metrics)
+            scheduler.start()
         
         # 创建初始种群
         if not self.population:
             self.create_initial_population(prompt)
         
-        best_overall = None
+        pipe = GenerationPipeline(self, self.pipeline) if self.pipeline else None
+        
+        try:
+            for gen in range(generations):
+                if scheduler and scheduler.should_stop(self.stats):
+                    break
+                
+                generation = len(self.stats.series)
+                self._emit("on_generation_start", generation)
+                
+                # 0. 由上一代选出的父代繁殖本代
+                self._reproduce_pending(test_cases, pipe)
+                
+                # 1. 评估所有变体 (流水线模式下同时从暂定精英投机变异)
+                if pipe and not scheduler:
+                    pipe.speculate(self.population)
+                start = time.perf_counter()
+                self._evaluate_generation(test_cases)
+                elapsed = time.perf_counter() - start
+                self.metrics.add_time("evaluate", elapsed)
+                self._emit("on_evaluate", self.population, elapsed)
+                
+                for variant in self.population:
+                    self.history.add(variant)
+                if self.operator_selector:
+                    self._credit_operators()
+                if self.surrogate:
+                    self.surrogate.observe(self.population, generation)
+                    self.surrogate.fit((r.content, r.fitness) for r in self.history.evaluated())
+                if scheduler:
+                    scheduler.end_evaluation()
+                
+                seed = next((v for v in self.population if v.mutations == ["seed"]), None)
+                generation_stats = self.stats.record_generation(
+                    (v.fitness for v in self.population if v.evaluated),
+                    seed_fitness=seed.fitness if seed is not None and seed.evaluated else None
+                )
+                
+                # 2. 记录最佳
+                current_best = max(self.population, key=self._rank_key)
+                if self.best_variant is None or self._rank_key(current_best) > self._rank_key(self.best_variant):
+                    self.best_variant = current_best
+                
+                if verbose:
+                    print(f"Generation {gen + 1}/{generations} | Best fitness: {current_best.fitness:.3f}")
+                    print(f"  Prompt: {current_best.content[:80]}...")
+                
+                # 3. 选择父代
+                start = time.perf_counter()
+                parents = self.select_parents()
+                elapsed = time.perf_counter() - start
+                self.metrics.add_time("select", elapsed)
+                self._emit("on_select", parents, elapsed)
+                
+                # 4. 登记下一代的繁殖 (预算不足以评估下一代时，本代即最后一代)
+                max_mutations = scheduler.mutation_allowance() if scheduler else None
+                if not (scheduler and scheduler.stop_reason):
+                    self._pending_reproduction = (current_best, parents, max_mutations)
+                
+                if checkpointer:
+                    with self.metrics.stage("checkpoint"):
+                        checkpointer.write_generation(self, prompt)
+                
+                self.metrics.end_generation(best_fitness=self.best_variant.fitness)
+                self._emit("on_generation_end", generation, generation_stats)
+                
+                yield GenerationSnapshot(
+                    generation=generation,
+                    best=self.best_variant,
+                    stats=generation_stats,
+                    population=list(self.population),
+                    stop_reason=scheduler.stop_reason if scheduler else None
+                )
+                
+                if scheduler and scheduler.stop_reason:
+                    break
+        finally:
+            if pipe:
+                pipe.close()
+            if scheduler:
+                self.budget_report = scheduler.report()
+                if verbose and scheduler.stop_reason:
+                    print(f"Stopped early: {scheduler.stop_reason}")
+    
+    def reproduce_pending(self, test_cases: List[TestCase]):
+        """
+        完成上一代选出父代后推迟的繁殖 (没有时什么都不做)
         
-        for gen in range(generations):
-            # 1. 评估所有变体
+        evolve_iter 在每代产出快照后才繁殖下一代；在两次 evolve 之间直接修改种群
+        (如岛屿模型替换迁入个体) 前先调用此方法，使改动作用于新一代。
+        """
+        self._reproduce_pending(test_cases)
+    
+    def _reproduce_pending(self, test_cases: List[TestCase], pipe: Optional[GenerationPipeline] = None):
+        """执行上一代选出父代后推迟的繁殖 (没有时什么都不做)"""
+        if self._pending_reproduction is None:
+            return
+        elite, parents, max_mutations = self._pending_reproduction
+        self._pending_reproduction = None
+        self._offer_mates(parents)
+        if pipe:
+            self.population = pipe.reproduce(elite, parents, test_cases, max_mutations)
+        else:
+            self.population = self._reproduce(elite, parents, max_mutations)
+    
+    async def aevolve_iter(
+        self,
+        prompt: str,
+        test_cases: List[TestCase],
+        generations: int = 5,
+        verbose: bool = True,
+        checkpoint: Optional[str] = None,
+        budget: Optional[EvolutionBudget] = None
+    ) -> AsyncIterator[GenerationSnapshot]:
+        """
+        evolve_iter() 的异步迭代器版本
+        
+        每代在线程池中推进，不阻塞事件循环 (异步评估函数在该线程自己的事件循环中运行)。
+        
+        使用:
+            async for snap in spore.aevolve_iter(prompt, cases):
+                await stream.send(snap.best.content)
+        """
+        loop = asyncio.get_running_loop()
+        steps = self.evolve_iter(prompt, test_cases, generations, verbose, checkpoint, budget)
+        done = object()
+        try:
+            while True:
+                snapshot = await loop.run_in_executor(None, next, steps, done)
+                if snapshot is done:
+                    break
+                yield snapshot
+        finally:
+            await loop.run_in_executor(None, steps.close)
+    
+    def _rank_key(self, variant: PromptVariant):
+        """比较最佳个体: 适应度优先，多目标模式下同分取更短的"""
+        if self.multi_objective:
+            return (variant.fitness, -self.count_tokens(variant.content))
+        return variant.fitness
+    
+    def _evaluate_generation(self, test_cases: List[TestCase]):
+        """按配置的评估模式 (小批量采样 / 竞速 / 全量) 评估当前种群"""
+        followers = self._screen_near_duplicates() if self.similarity is not None else []
+        skip = {id(v) for v, _ in followers}
+        variants = [v for v in self.population
+                    if id(v) not in skip and "near_duplicate_of" not in v.metadata]
+        
+        if self.sampler:
+            self.sampler.evaluate(self, variants, test_cases)
+        elif self.racing:
+            race_population(self, variants, test_cases, self.racing)
+        else:
+            self.evaluate_population(variants, test_cases)
+        
+        if self.similarity is not None:
+            for follower, leader in followers:
+                follower.fitness = leader.fitness
+                follower.evaluated = leader.evaluated
+                follower.num_cases = leader.num_cases
+                follower.metadata["near_duplicate_of"] = leader.id
             for variant in self.population:
-                if variant.fitness == 0:  # 未评估
-                    variant.fitness = self.evaluate(variant.content, test_cases)
-            
-            # 2. 记录最佳
-            current_best = max(self.population, key=lambda x: x.fitness)
-            if best_overall is None or current_best.fitness > best_overall.fitness:
-                best_overall = current_best
-            
-            if verbose:
-                print(f"Generation {gen + 1}/{generations} | Best fitness: {current_best.fitness:.3f}")
-                print(f"  Prompt: {current_best.content[:80]}...")
-            
-            # 3. 选择父代
-            parents = self.select_parents()
-            
-            # 4. 生成新一代
-            new_population = []
+                if variant.evaluated and "near_duplicate_of" not in variant.metadata:
+                    self.similarity.add(variant.id, variant.content, (variant.fitness, variant.num_cases))
+    
+    def _inherit_near_duplicate(self, variant: PromptVariant, signature=None) -> bool:
+        """在已评估个体中查找近重复；找到则沿用其适应度"""
+        match = self.similarity.query(variant.content, signature)
+        if match is None:
+            return False
+        key, similarity, (fitness, num_cases) = match
+        variant.fitness = fitness
+        variant.evaluated = True
+        variant.num_cases = num_cases
+        variant.metadata["near_duplicate_of"] = key
+        variant.metadata["similarity"] = similarity
+        self.metrics.count("near_duplicates")
+        return True
+    
+    def _screen_near_duplicates(self) -> List[Tuple[PromptVariant, PromptVariant]]:
+        """
+        评估前处理未评估变体中的近重复
+        
+        与历史个体近似的按 dedup.action 沿用适应度或重新变异；本代内彼此近似的只评估第一个，
+        返回 (跟随者, 代表) 列表，代表评估完成后跟随者沿用其结果。
+        """
+        hasher = self.similarity.hasher
+        batch = NearDuplicateIndex(self.dedup.threshold, self.dedup.num_perm, self.dedup.bands)
+        followers = []
+        
+        for i, variant in enumerate(self.population):
+            if variant.evaluated:
+                continue
+            signature = hasher.signature(variant.content)
             
-            # 保留精英
-            new_population.append(current_best)
+            if self.dedup.action == "regenerate" and self.mutation_strategies and variant.parent_id is not None:
+                record = self.history[variant.parent_id]
+                parent = PromptVariant(content=record.content, generation=record.generation, id=record.id)
+                for _ in range(self.dedup.max_regenerate):
+                    if self.similarity.query(variant.content, signature) is None \
+                            and batch.query(variant.content, signature) is None:
+                        break
+                    variant = self._spawn(parent, variant.generation)
+                    signature = hasher.signature(variant.content)
+                    self.metrics.count("near_duplicates_regenerated")
+                self.population[i] = variant
             
-            # 生成新变体
-            while len(new_population) < self.population_size:
-                parent = random.choice(parents)
-                if random.random() < self.mutation_rate:
-                    child = self.mutate(parent)
+            if self._inherit_near_duplicate(variant, signature):
+                continue
+            match = batch.query(variant.content, signature)
+            if match is not None:
+                followers.append((variant, self.population[match[0]]))
+                self.metrics.count("near_duplicates")
+            else:
+                batch.add(i, variant.content, signature=signature)
+        
+        return followers
+    
+    def _reproduce(
+        self,
+        elite: PromptVariant,
+        parents: List[PromptVariant],
+        max_mutations: Optional[int] = None
+    ) -> List[PromptVariant]:
+        """保留精英，其余由父代变异或克隆产生；变异次数达到 max_mutations 后只克隆"""
+        new_population = [elite]
+        mutations = 0
+        screened: List[Tuple[int, PromptVariant]] = []
+        screening = self.surrogate is not None and self.surrogate.ready
+        
+        while len(new_population) < self.population_size:
+            parent = random.choice(parents)
+            can_mutate = max_mutations is None or mutations < max_mutations
+            if can_mutate and random.random() < self.mutation_rate:
+                if screening:
+                    screened.append((len(new_population), parent))
+                    child = None
                 else:
-                    # 克隆
-                    child = PromptVariant(
-                        content=parent.content,
-                        generation=parent.generation,
-                        parent=parent.content,
-                        mutations=["clone"]
-                    )
-                new_population.append(child)
-            
-            self.population = new_population
-            self.history.extend([p for p in self.population if p.fitness > 0])
+                    child = self.mutate(parent)
+                mutations += 1
+            else:
+                child = self._clone(parent)
+            new_population.append(child)
         
-        return best_overall.content if best_overall else prompt
+        if screened:
+            candidates = [
+                (parent, strategy, *self._mutate_content(strategy, parent))
+                for parent, strategy in self._plan_candidates([p for _, p in screened], max_mutations)
+            ]
+            for (slot, _), (parent, strategy, content, elapsed) in zip(
+                screened, self._screen_candidates(candidates, len(screened))
+            ):
+                new_population[slot] = self._register_child(parent, parent.generation + 1, strategy, content, elapsed)
+        
+        return new_population
+    
+    def _plan_candidates(
+        self,
+        parents: List[PromptVariant],
+        max_mutations: Optional[int] = None
+    ) -> List[Tuple[PromptVariant, Optional[MutationStrategy]]]:
+        """代理模型筛选时要生成的候选: 每个变异名额 oversample 个 (不超过预算允许的变异数)"""
+        total = math.ceil(len(parents) * self.surrogate.config.oversample)
+        if max_mutations is not None:
+            total = max(len(parents), min(total, max_mutations))
+        return [(parents[i % len(parents)], self._pick_strategy()) for i in range(total)]
+    
+    def _screen_candidates(self, candidates: List[Tuple], keep: int) -> List[Tuple]:
+        """按代理模型预测保留 keep 个候选 (parent, strategy, content, elapsed)"""
+        chosen = self.surrogate.select([c[2] for c in candidates], keep)
+        self.metrics.count("surrogate_screened_out", len(candidates) - len(chosen))
+        return [candidates[i] for i in chosen]
+    
+    def _clone(self, parent: PromptVariant) -> PromptVariant:
+        """克隆: 与父代是同一个体，沿用其谱系 ID 和评估结果"""
+        return PromptVariant(
+            content=parent.content,
+            fitness=parent.fitness,
+            evaluated=parent.evaluated,
+            num_cases=parent.num_cases,
+            fitness_ci=parent.fitness_ci,
+            generation=parent.generation,
+            id=parent.id,
+            parent_id=parent.parent_id,
+            mutations=["clone"]
+        )
+    
+    def resume(
+        self,
+        checkpoint: str,
+        test_cases: List[TestCase],
+        generations: int = 5,
+        verbose: bool = True
+    ) -> str:
+        """
+        从检查点续跑
+        
+        恢复种群、谱系、统计和随机数状态，然后跑完剩余的代数 (generations 为总代数)。
+        评估函数和变异策略需要像首次运行时一样预先设置好。
+        """
+        checkpointer = Checkpointer(checkpoint)
+        prompt = checkpointer.restore(self, PromptVariant)
+        if prompt is None:
+            raise ValueError(f"检查点中没有完整的代: {checkpoint}")
+        self._checkpointer = checkpointer
+        
+        remaining = generations - len(self.stats.series)
+        if remaining <= 0:
+            return self.best_variant.content if self.best_variant else prompt
+        
+        return self.evolve(prompt, test_cases, generations=remaining, verbose=verbose, checkpoint=checkpoint)
+    
+    def get_lineage(self, variant: Optional[PromptVariant] = None) -> List[str]:
+        """从种子到指定变体 (默认当前最佳) 的提示词演化路径"""
+        variant = variant or self.best_variant
+        record_id = variant.id if variant is not None else None
+        if record_id is None:
+            # 尚未产生最佳变体 (如从旧检查点恢复) 时才扫描历史
+            best = self.history.best()
+            if best is None:
+                return []
+            record_id = best.id
+        return [record.content for record in self.history.path_to(record_id)]
     
     def get_statistics(self) -> Dict:
-        """获取进化统计"""
-        if not self.history:
+        """获取进化统计 (增量维护，常数时间)"""
+        summary = self.stats.summary()
+        if not summary:
             return {}
+        summary["total_variants"] = self.history.num_evaluated
+        if self.surrogate and self.surrogate.accuracy:
+            summary["surrogate"] = dict(self.surrogate.accuracy[-1])
+        if self.operator_selector and self.mutation_strategies:
+            summary["operators"] = self.operator_selector.summary([s.name for s in self.mutation_strategies])
+        return summary
+    
+    def count_tokens(self, content: str) -> int:
+        """提示词 token 数 (多目标模式下使用，按内容缓存)"""
+        if content not in self._token_counts:
+            counter = self._count_tokens or MultiObjectiveConfig().counter()
+            self._token_counts[content] = counter(content)
+        return self._token_counts[content]
+    
+    def get_pareto_front(self) -> List[PromptVariant]:
+        """
+        历史中所有已评估提示词在 (适应度 ↑, token 数 ↓) 上的帕累托前沿，按 token 数升序
         
-        fitnesses = [p.fitness for p in self.history]
+        每个变体的 metadata["tokens"] 为其 token 数。
+        """
+        records = {}
+        for record in self.history.evaluated():
+            if record.content not in records or record.fitness > records[record.content].fitness:
+                records[record.content] = record
+        records = list(records.values())
+        if not records:
+            return []
         
-        return {
-            "total_variants": len(self.history),
-            "generations": max(p.generation for p in self.history) + 1,
-            "best_fitness": max(fitnesses),
-            "avg_fitness": sum(fitnesses) / len(fitnesses),
-            "improvement": max(fitnesses) - fitnesses[0] if fitnesses else 0
-        }
+        fitness = np.array([r.fitness for r in records])
+        tokens = np.array([self.count_tokens(r.content) for r in records])
+        return [
+            PromptVariant(
+                content=records[i].content,
+                fitness=float(fitness[i]),
+                evaluated=True,
+                generation=records[i].generation,
+                id=records[i].id,
+                parent_id=records[i].parent_id,
+                mutations=[records[i].mutation],
+                metadata={"tokens": int(tokens[i])}
+            )
+            for i in pareto_front_2d(fitness, tokens)
+        ]
+    
+    def shortest_prompt(self, min_fitness: float) -> Optional[PromptVariant]:
+        """帕累托前沿上适应度不低于 min_fitness 的最短提示词"""
+        return next((v for v in self.get_pareto_front() if v.fitness >= min_fitness), None)
+    
+    def get_generation_stats(self) -> List[GenerationStats]:
+        """每代的 best / mean / variance / best_so_far / improvement 时间序列"""
+        return list(self.stats.series)
+
+
+# ========== LLM 评分解析 ==========
+
+def _parse_score(text: str) -> Optional[float]:
+    """解析 0-10 的单个分数，无法解析返回 None"""
+    match = re.search(r"-?\d+(?:\.\d+)?", text or "")
+    if not match:
+        return None
+    return min(max(float(match.group()), 0.0), 10.0)
+
+
+def _batch_judge_prompt(items: List[Tuple[TestCase, str]]) -> str:
+    blocks = "\n\n".join(
+        f"""### {i + 1}
+期望: {case.expected}
+
+回答: {result}"""
+        for i, (case, result) in enumerate(items)
+    )
+    return f"""你是一个评估专家。请对以下每条回答的质量分别评分 0-10。
+
+{blocks}
+
+只输出 JSON，不要其他内容，格式: {{"scores": [{{"id": 1, "score": 8}}, {{"id": 2, "score": 6}}]}}"""
+
+
+def _parse_batch_scores(text: str, count: int) -> List[Optional[float]]:
+    """解析批量评分，返回按 id 对齐的分数列表；缺失或非法的条目为 None"""
+    scores: List[Optional[float]] = [None] * count
+    data = extract_json(text)
+    if isinstance(data, dict):
+        data = data.get("scores")
+    if not isinstance(data, list):
+        return scores
+    
+    for position, item in enumerate(data):
+        if isinstance(item, dict):
+            item_id, value = item.get("id", position + 1), item.get("score")
+        else:
+            item_id, value = position + 1, item
+        try:
+            index = int(item_id) - 1
+            score = float(value)
+        except (TypeError, ValueError):
+            continue
+        if 0 <= index < count and scores[index] is None:
+            scores[index] = min(max(score, 0.0), 10.0)
+    return scores
 
 
 # 便捷函数
@@ -216,66 +921,145 @@ def quick_evolve(
     test_cases: List[Dict],
     model: str = "gpt-4",
     api_key: str = None,
-    generations: int = 5
+    generations: int = 5,
+    base_url: str = None,
+    max_concurrency: int = 8,
+    judge_batch_size: int = 1,
+    population_size: int = 10,
+    metrics_sinks: Optional[List] = None,
+    client=None,
+    async_client=None,
+    llm_cache: Optional[LLMResponseCache] = None,
+    provider: str = "openai",
+    pipeline: Optional[PipelineConfig] = None,
+    local_operators: bool = False
 ) -> str:
-    """快速进化 - 使用 OpenAI API"""
+    """
+    快速进化 - 使用 OpenAI (openai>=1.0) 或 Anthropic API
     
-    import openai
+    评估时所有测试用例的生成请求并发发出，每个用例生成完成后立即发起评分请求。
+    max_concurrency 限制同时在途的 LLM 请求数；遇到 429 时自动收缩并发并退避重试 (见 spore_llm)。
+    provider: "openai" 或 "anthropic"。
+    judge_batch_size > 1 时，每次评分请求以 JSON 形式同时给多条回答打分。
+    client / async_client 可传入 OpenAI 兼容的客户端 (如 spore_fake.FakeLLM) 代替真实 API。
+    metrics_sinks: 计量输出端 (见 spore_metrics)，每代推送各阶段耗时、调用数和 token 用量。
+    llm_cache: LLM 响应缓存 (见 spore_llm)，默认仅在内存中；评分请求以 temperature=0 发出，
+               同一评分请求不会重复付费。传入带 db_path 的缓存可跨运行复用。
+    pipeline: 流水线繁殖配置 (见 spore_pipeline)，变异并发进行、子代产生后立即评分。
+    local_operators: 同时使用不调用 LLM 的本地变异 / 交叉算子 (见 spore_operators)，
+                     并按观测到的适应度增益自适应分配各算子的选择概率。
+    """
     
-    spore = PromptSpore(model=model, api_key=api_key)
+    spore = PromptSpore(
+        model=model,
+        api_key=api_key,
+        base_url=base_url,
+        population_size=population_size,
+        max_concurrency=max_concurrency,
+        pipeline=pipeline,
+        operator_selection=OperatorSelectionConfig() if local_operators else None
+    )
+    for sink in metrics_sinks or []:
+        spore.metrics.add_sink(sink)
     
-    # 简单的 LLM 评估器
-    def llm_evaluate(p: str, cases: List[Dict]) -> float:
-        scores = []
-        for case in cases:
-            response = openai.ChatCompletion.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": p},
-                    {"role": "user", "content": case["input"]}
-                ]
-            )
-            result = response.choices[0].message.content
-            
-            # 让 LLM 自己评分
-            score_response = openai.ChatCompletion.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": f"""你是一个评估专家。请对以下回答质量评分 0-10。
+    cache = llm_cache if llm_cache is not None else LLMResponseCache()
+    if client is None and async_client is None:
+        llm = create_llm_client(provider, model=model, api_key=api_key, base_url=base_url,
+                                cache=cache, max_concurrency=max_concurrency)
+    else:
+        llm = LLMClient(client, model=model, cache=cache, async_client=async_client,
+                        limiter=AIMDLimiter(initial=max_concurrency, max_limit=max_concurrency))
+    
+    async def chat(messages: List[Dict], stage: str, **params) -> str:
+        response = await llm.acomplete(messages, **params)
+        spore.metrics.record_usage(stage, response)
+        return response.text
+    
+    async def generate(p: str, index: int, case: TestCase) -> Tuple[int, str]:
+        result = await chat([
+            {"role": "system", "content": p},
+            {"role": "user", "content": case.input}
+        ], stage="generate")
+        return index, result
+    
+    async def judge_one(case: TestCase, result: str) -> float:
+        # 让 LLM 自己评分
+        score_text = await chat([
+            {"role": "system", "content": f"""你是一个评估专家。请对以下回答质量评分 0-10。
 
-期望: {case.get('expected', '')}
+期望: {case.expected}
 
 回答: {result}
 
 只输出一个数字。"""}
-                ]
-            )
-            try:
-                score = float(score_response.choices[0].message.content.strip())
-            except:
-                score = 5.0
-            scores.append(score / 10)
+        ], stage="judge", temperature=0)
+        score = _parse_score(score_text)
+        return 5.0 if score is None else score
+    
+    async def judge_batch(items: List[Tuple[TestCase, str]]) -> List[float]:
+        if len(items) == 1:
+            return [await judge_one(*items[0])]
+        
+        score_text = await chat([
+            {"role": "system", "content": _batch_judge_prompt(items)}
+        ], stage="judge", temperature=0)
+        scores = _parse_batch_scores(score_text, len(items))
+        
+        # 批量结果中缺失或无法解析的条目单独重评
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            retried = await asyncio.gather(*(judge_one(*items[i]) for i in missing))
+            for i, score in zip(missing, retried):
+                scores[i] = score
+        return scores
+    
+    # 简单的 LLM 评估器
+    async def llm_evaluate(p: str, cases: List[TestCase]) -> float:
+        if not cases:
+            return 0
+        
+        # 生成全部并发；每凑满 judge_batch_size 条回答就立即发起一次评分
+        generations_done = [generate(p, i, case) for i, case in enumerate(cases)]
+        judge_tasks = []
+        batch_indices: List[int] = []
+        batch_items: List[Tuple[TestCase, str]] = []
+        
+        for next_done in asyncio.as_completed(generations_done):
+            index, result = await next_done
+            batch_indices.append(index)
+            batch_items.append((cases[index], result))
+            if len(batch_items) >= judge_batch_size:
+                judge_tasks.append((batch_indices, asyncio.ensure_future(judge_batch(batch_items))))
+                batch_indices, batch_items = [], []
+        if batch_items:
+            judge_tasks.append((batch_indices, asyncio.ensure_future(judge_batch(batch_items))))
         
-        return sum(scores) / len(scores) if scores else 0
+        scores = [0.0] * len(cases)
+        for indices, task in judge_tasks:
+            for index, score in zip(indices, await task):
+                scores[index] = score / 10
+        
+        return sum(scores) / len(scores)
     
     # 简单变异策略
     class SimpleMutation:
         name = "llm_improve"
         
         def mutate(self, p: str) -> str:
-            response = openai.ChatCompletion.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": """你是一个提示词优化专家。请改进以下提示词，让它效果更好。
+            response = llm.complete([
+                {"role": "system", "content": """你是一个提示词优化专家。请改进以下提示词，让它效果更好。
                     
 只输出改进后的提示词，不要其他解释。"""},
-                    {"role": "user", "content": p}
-                ]
-            )
-            return response.choices[0].message.content
+                {"role": "user", "content": p}
+            ])
+            spore.metrics.record_usage("mutate", response)
+            return response.text
     
     spore.add_mutation_strategy(SimpleMutation())
-    spore.set_evaluator(llm_evaluate)
+    if local_operators:
+        for operator in default_local_operators():
+            spore.add_mutation_strategy(operator)
+    spore.set_evaluator(llm_evaluate, name=f"quick_evolve.llm_judge:{model}")
     
     # 转换测试用例格式
     tc = [TestCase(**t) for t in test_cases]
@@ -0,0 +1,197 @@
+"""
+Spore Bench - 离线进化基准测试
+用 FakeLLM 替代真实 API，测量墙钟时间、每代 LLM 调用数和峰值内存
+
+使用:
+    python spore_bench.py                         # 默认网格
+    python spore_bench.py --quick --json out.json
+    python spore_bench.py --baseline out.json     # 与基线比较，退化超过容差时退出码为 1
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List
+
+from spore_fake import FakeLLM, lognormal_latency
+
+
+@dataclass
+class BenchResult:
+    """单个场景的测量结果"""
+    name: str
+    params: Dict
+    wall_time: float
+    llm_calls: int
+    calls_per_generation: float
+    prompt_tokens: int
+    completion_tokens: int
+    max_in_flight: int
+    peak_memory_kb: float
+
+    @property
+    def key(self) -> str:
+        return self.name + ":" + ",".join(f"{k}={v}" for k, v in sorted(self.params.items()))
+
+
+def _measure(name: str, params: Dict, llm: FakeLLM, generations: int, run: Callable[[], object]) -> BenchResult:
+    random.seed(0)
+    llm.reset_usage()
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        run()
+    wall_time = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    usage = llm.usage
+    return BenchResult(
+        name=name,
+        params=params,
+        wall_time=wall_time,
+        llm_calls=usage.calls,
+        calls_per_generation=usage.calls / max(1, generations),
+        prompt_tokens=usage.prompt_tokens,
+        completion_tokens=usage.completion_tokens,
+        max_in_flight=usage.max_in_flight,
+        peak_memory_kb=peak / 1024,
+    )
+
+
+# ========== 场景 ==========
+
+def bench_quick_evolve(llm: FakeLLM, population_size: int, generations: int, num_cases: int) -> BenchResult:
+    from spore import quick_evolve
+
+    cases = [{"input": f"问题 {i}", "expected": f"答案 {i}"} for i in range(num_cases)]
+    params = {"population_size": population_size, "generations": generations, "cases": num_cases}
+    return _measure("quick_evolve", params, llm, generations, lambda: quick_evolve(
+        "你是一个助手。请回答用户的问题。",
+        cases,
+        generations=generations,
+        population_size=population_size,
+        client=llm,
+        async_client=llm.async_client(),
+    ))
+
+
+def bench_evolve_agent(llm: FakeLLM, num_genes: int, iterations: int, num_feedback: int) -> BenchResult:
+    from agent_spore import AgentSpore, AgentGene, create_feedback
+
+    genes = [AgentGene(f"gene_{i}", f"基因 {i} 的当前内容。" * 10, f"基因 {i}") for i in range(num_genes)]
+    feedback = [create_feedback(f"任务 {i}", "深入分析", "简单回答", f"问题 {i}") for i in range(num_feedback)]
+    params = {"genes": num_genes, "iterations": iterations, "feedback": num_feedback}
+    spore = AgentSpore(llm_client=llm, model="fake")
+    return _measure("evolve_agent", params, llm, iterations,
+                    lambda: spore.evolve_agent(genes, feedback, max_iterations=iterations))
+
+
+def bench_evolve_agent_per_gene(llm: FakeLLM, num_genes: int, iterations: int, num_feedback: int) -> BenchResult:
+    from agent_spore import AgentSpore, AgentGene, create_feedback
+
+    genes = [AgentGene(f"gene_{i}", f"基因 {i} 的当前内容。" * 10, f"基因 {i}") for i in range(num_genes)]
+    feedback = [create_feedback(f"任务 {i}", "深入分析", "简单回答", f"问题 {i}") for i in range(num_feedback)]
+    params = {"genes": num_genes, "iterations": iterations, "feedback": num_feedback}
+    spore = AgentSpore(llm_client=llm, model="fake")
+    return _measure("evolve_agent_per_gene", params, llm, iterations,
+                    lambda: spore.evolve_agent(genes, feedback, max_iterations=iterations, per_gene=True))
+
+
+def bench_spore_tool(llm: FakeLLM, num_calls: int) -> BenchResult:
+    from spore_tool import create_spore_tool
+
+    tool = create_spore_tool(llm, model="fake")
+    params = {"calls": num_calls}
+
+    def run():
+        gene = "你是一个有帮助的助手。"
+        for i in range(num_calls):
+            gene = json.loads(tool("system_prompt", gene, f"反馈 {i}"))["evolved_gene"]
+
+    return _measure("spore_evolve", params, llm, num_calls, run)
+
+
+def run_suite(quick: bool = False, latency: float = 0.005, error_rate: float = 0.0) -> List[BenchResult]:
+    llm = FakeLLM(latency=lognormal_latency(latency) if latency > 0 else 0.0, error_rate=error_rate, seed=0)
+
+    populations = [5, 10] if quick else [5, 10, 20]
+    generation_counts = [3] if quick else [3, 6]
+    case_counts = [5, 20] if quick else [5, 20, 50]
+
+    results = []
+    for pop, gens, cases in itertools.product(populations, generation_counts, case_counts):
+        results.append(bench_quick_evolve(llm, pop, gens, cases))
+    for genes in ([2, 5] if quick else [2, 5, 10]):
+        results.append(bench_evolve_agent(llm, genes, iterations=3, num_feedback=10))
+        results.append(bench_evolve_agent_per_gene(llm, genes, iterations=3, num_feedback=10))
+    results.append(bench_spore_tool(llm, num_calls=5 if quick else 20))
+    return results
+
+
+# ========== 报告与基线比较 ==========
+
+def format_table(results: List[BenchResult]) -> str:
+    header = f"{'scenario':<56} {'wall(s)':>8} {'calls':>7} {'calls/gen':>10} {'tokens':>9} {'inflight':>9} {'peak(KB)':>10}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        lines.append(
+            f"{r.key:<56} {r.wall_time:>8.3f} {r.llm_calls:>7} {r.calls_per_generation:>10.1f} "
+            f"{r.prompt_tokens + r.completion_tokens:>9} {r.max_in_flight:>9} {r.peak_memory_kb:>10.1f}"
+        )
+    return "\n".join(lines)
+
+
+def compare(results: List[BenchResult], baseline: List[Dict], tolerance: float) -> List[str]:
+    """返回超出容差的退化项"""
+    base = {BenchResult(**b).key: b for b in baseline}
+    regressions = []
+    for r in results:
+        b = base.get(r.key)
+        if b is None:
+            continue
+        for metric in ("wall_time", "llm_calls", "peak_memory_kb"):
+            old, new = b[metric], getattr(r, metric)
+            if old > 0 and new > old * (1 + tolerance):
+                regressions.append(f"{r.key} {metric}: {old:.3f} -> {new:.3f}")
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Prompt Spore 离线基准测试")
+    parser.add_argument("--quick", action="store_true", help="只跑小网格")
+    parser.add_argument("--latency", type=float, default=0.005, help="FakeLLM 延迟中位数 (秒)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="FakeLLM 错误率")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    parser.add_argument("--baseline", help="与基线 JSON 比较")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="允许的相对退化")
+    args = parser.parse_args(argv)
+
+    results = run_suite(quick=args.quick, latency=args.latency, error_rate=args.error_rate)
+    print(format_table(results))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump([asdict(r) for r in results], f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\n⚠️ 性能退化:")
+            for line in regressions:
+                print("  " + line)
+            return 1
+        print("\n✅ 未发现性能退化")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""
+Spore Budget - token / 调用次数 / 墙钟时间预算与提前停止
+"""
+
+import math
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+DIMENSIONS = ("tokens", "calls", "seconds")
+
+
+@dataclass
+class EvolutionBudget:
+    """
+    进化预算
+
+    max_* 为 None 表示该维度不限。patience 代内 best_so_far 提升不超过 min_delta 视为收敛。
+    """
+    max_tokens: Optional[int] = None
+    max_calls: Optional[int] = None
+    max_seconds: Optional[float] = None
+    patience: Optional[int] = None
+    min_delta: float = 0.0
+
+    def limits(self) -> Dict[str, float]:
+        limits = {"tokens": self.max_tokens, "calls": self.max_calls, "seconds": self.max_seconds}
+        return {k: v for k, v in limits.items() if v is not None}
+
+
+def _diff_summary(now: Dict, base: Dict) -> Dict:
+    """两次 EvolutionMetrics.summary() 之差"""
+    base_stages = base.get("stages", {})
+    base_counters = base.get("counters", {})
+    base_tokens = base.get("tokens", {})
+    return {
+        "stages": {
+            s: {"seconds": v["seconds"] - base_stages.get(s, {}).get("seconds", 0.0)}
+            for s, v in now["stages"].items()
+        },
+        "counters": {k: v - base_counters.get(k, 0) for k, v in now["counters"].items()},
+        "tokens": {
+            s: {kind: n - base_tokens.get(s, {}).get(kind, 0) for kind, n in t.items()}
+            for s, t in now["tokens"].items()
+        },
+    }
+
+
+def _spend_from_metrics(summary: Dict) -> Dict[str, float]:
+    """从 EvolutionMetrics 累计值里读出总花费和变异部分的花费"""
+    counters = summary["counters"]
+    tokens = summary["tokens"]
+    stages = summary["stages"]
+
+    llm_calls = {k[len("llm_calls."):]: v for k, v in counters.items() if k.startswith("llm_calls.")}
+    mutations = sum(v for k, v in counters.items() if k.startswith("mutations."))
+    if llm_calls:
+        calls = sum(llm_calls.values())
+        mutate_calls = llm_calls.get("mutate", 0)
+    else:
+        # 评估器 / 变异策略没有上报 LLM 用量时，按调用次数估算
+        calls = counters.get("evaluator_calls", 0) + mutations
+        mutate_calls = mutations
+
+    return {
+        "tokens": sum(t["prompt"] + t["completion"] for t in tokens.values()),
+        "calls": calls,
+        "mutate_tokens": sum(tokens.get("mutate", {}).values()),
+        "mutate_calls": mutate_calls,
+        "mutate_seconds": stages.get("mutate", {}).get("seconds", 0.0),
+        "mutations": mutations,
+    }
+
+
+class BudgetScheduler:
+    """
+    在预算内分配评估与变异
+
+    - 每代开始前: 预算耗尽或已收敛则停止
+    - 繁殖前: 先为下一代的评估预留花费，剩余部分决定本代最多做几次变异；
+      连下一代评估都负担不起时不再繁殖，本代即最后一代
+    """
+
+    def __init__(self, budget: EvolutionBudget, metrics):
+        self.budget = budget
+        self.metrics = metrics
+        self.stop_reason: Optional[str] = None
+        self._t0 = 0.0
+        self._base: Dict[str, float] = {}
+        self._base_summary: Dict = {}
+        self._generations = 0
+
+    def start(self):
+        self._t0 = time.perf_counter()
+        self._base_summary = self.metrics.summary()
+        self._base = _spend_from_metrics(self._base_summary)
+        self._generations = 0
+        self.stop_reason = None
+
+    def spent(self) -> Dict[str, float]:
+        now = _spend_from_metrics(self.metrics.summary())
+        spent = {k: now[k] - self._base.get(k, 0) for k in now}
+        spent["seconds"] = time.perf_counter() - self._t0
+        return spent
+
+    def remaining(self) -> Dict[str, float]:
+        spent = self.spent()
+        return {k: limit - spent[k] for k, limit in self.budget.limits().items()}
+
+    def should_stop(self, stats) -> Optional[str]:
+        """每代开始前检查；返回停止原因或 None"""
+        if self.stop_reason:
+            return self.stop_reason
+
+        for dim, left in self.remaining().items():
+            if left <= 0:
+                self.stop_reason = f"budget_exhausted:{dim}"
+                return self.stop_reason
+
+        patience = self.budget.patience
+        series = stats.series
+        if patience and len(series) > patience:
+            gain = series[-1].best_so_far - series[-1 - patience].best_so_far
+            if gain <= self.budget.min_delta:
+                self.stop_reason = "converged"
+                return self.stop_reason
+        return None
+
+    def end_evaluation(self):
+        """一代评估结束"""
+        self._generations += 1
+
+    def mutation_allowance(self) -> Optional[int]:
+        """
+        本代最多可做的变异次数；None 表示不限制
+
+        返回 0 且 stop_reason 被设置时，表示剩余预算不够评估下一代。
+        """
+        limits = self.budget.limits()
+        if not limits or self._generations == 0:
+            return None
+
+        spent = self.spent()
+        remaining = {k: limits[k] - spent[k] for k in limits}
+        unit_of = {
+            "tokens": spent["mutate_tokens"],
+            "calls": spent["mutate_calls"],
+            "seconds": spent["mutate_seconds"],
+        }
+        mutations = max(1, spent["mutations"])
+
+        allowance = None
+        for dim, left in remaining.items():
+            evaluation_cost = (spent[dim] - unit_of[dim]) / self._generations
+            if left < evaluation_cost:
+                self.stop_reason = f"budget_exhausted:{dim}"
+                return 0
+            unit = unit_of[dim] / mutations
+            if unit > 0:
+                fits = math.floor((left - evaluation_cost) / unit)
+                allowance = fits if allowance is None else min(allowance, fits)
+        return allowance
+
+    def report(self) -> Dict:
+        """按维度和阶段列出本次运行的花费"""
+        summary = _diff_summary(self.metrics.summary(), self._base_summary)
+        spent = self.spent()
+        return {
+            "stop_reason": self.stop_reason,
+            "generations": self._generations,
+            "spent": {dim: spent[dim] for dim in DIMENSIONS},
+            "limits": self.budget.limits(),
+            "by_stage": {
+                "seconds": {s: v["seconds"] for s, v in summary["stages"].items()},
+                "tokens": {s: t["prompt"] + t["completion"] for s, t in summary["tokens"].items()},
+                "calls": {k: v for k, v in summary["counters"].items()
+                          if k.startswith("llm_calls.") or k == "evaluator_calls"},
+            },
+        }
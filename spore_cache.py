@@ -0,0 +1,119 @@
+"""
+Spore Cache - 适应度缓存
+同一段提示词在同一组测试用例、同一个评估器下只评估一次
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+
+def hash_test_cases(test_cases: List) -> str:
+    """测试用例集合的哈希 (与顺序无关)"""
+    items = sorted(
+        json.dumps([tc.input, tc.expected, tc.weight], ensure_ascii=False)
+        for tc in test_cases
+    )
+    return hashlib.sha256("\n".join(items).encode("utf-8")).hexdigest()
+
+
+def make_cache_key(prompt: str, test_cases: List, evaluator_id: str) -> str:
+    """(提示词内容, 测试集, 评估器) → 缓存键"""
+    h = hashlib.sha256()
+    for part in (prompt, hash_test_cases(test_cases), evaluator_id):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class FitnessCache:
+    """
+    适应度缓存 - 内存 LRU + 可选 SQLite 持久层
+
+    使用:
+        cache = FitnessCache(max_size=2048, db_path="fitness.db")
+        spore = PromptSpore(fitness_cache=cache)
+    """
+
+    def __init__(self, max_size: int = 1024, db_path: Optional[str] = None):
+        self.max_size = max_size
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+
+        self._memory: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS fitness ("
+                "key TEXT PRIMARY KEY, fitness REAL NOT NULL, created REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def get(self, key: str) -> Optional[float]:
+        """查询缓存，未命中返回 None"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT fitness FROM fitness WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    self._remember(key, row[0])
+                    self.hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, fitness: float):
+        """写入缓存"""
+        with self._lock:
+            self._remember(key, fitness)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO fitness (key, fitness, created) VALUES (?, ?, ?)",
+                    (key, fitness, time.time())
+                )
+                self._db.commit()
+
+    def _remember(self, key: str, fitness: float):
+        if self.max_size <= 0:
+            return
+        self._memory[key] = fitness
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        """清空内存层 (持久层保留)"""
+        with self._lock:
+            self._memory.clear()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._memory),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,205 @@
+"""
+Spore Checkpoint - 进化检查点与断点续跑
+每代结束向 JSONL 文件追加一行增量，崩溃后从最后一个完整的代继续
+"""
+
+import json
+import os
+import random
+from typing import Dict, List, Optional
+
+CHECKPOINT_VERSION = 1
+
+
+def _to_tuple(value):
+    """json 会把 random.getstate() 中的元组变成列表，这里还原"""
+    if isinstance(value, list):
+        return tuple(_to_tuple(v) for v in value)
+    return value
+
+
+class Checkpointer:
+    """
+    追加式检查点
+
+    文件格式 (每行一个 JSON):
+        {"type": "header", ...}                 运行配置
+        {"type": "generation", ...}             每代的增量: 新文本、新谱系记录、
+                                                适应度更新、当前种群、统计、RNG 状态
+
+    只追加不重写，单代写入量与历史长度无关。
+    适应度缓存和分数矩阵不写入检查点；配合 FitnessCache(db_path=...) 续跑时不会重复付费。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._texts_written = 0
+        self._records_written = 0
+        self._has_header = self.exists()
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path) and os.path.getsize(self.path) > 0
+
+    def attach(self, spore):
+        """开始跟踪 spore 谱系中的适应度更新"""
+        if spore.history.dirty is None:
+            spore.history.dirty = set()
+
+    def write_generation(self, spore, prompt: str):
+        """写出一代的增量"""
+        history = spore.history
+
+        if not self._has_header:
+            self._append({
+                "type": "header",
+                "version": CHECKPOINT_VERSION,
+                "prompt": prompt,
+                "model": spore.model,
+                "population_size": spore.population_size,
+                "mutation_rate": spore.mutation_rate,
+                "evaluator_id": spore._get_evaluator_id(),
+            })
+            self._has_header = True
+
+        updates = []
+        if history.dirty:
+            updates = [
+                [i, history[i].fitness, int(history[i].evaluated)]
+                for i in sorted(history.dirty) if i < self._records_written
+            ]
+            history.dirty.clear()
+
+        best = spore.best_variant
+        entry = {
+            "type": "generation",
+            "generation": len(spore.stats.series),
+            "texts": history.texts_since(self._texts_written),
+            "records": history.records_since(self._records_written),
+            "updates": updates,
+            "population": [_variant_state(v) for v in spore.population],
+            "pending": _pending_state(spore),
+            "best": _variant_state(best) if best is not None else None,
+            "stats": spore.stats.to_state(),
+            "generation_stats": spore.stats.series[-1].to_dict() if spore.stats.series else None,
+            "rng_state": random.getstate(),
+        }
+        self._append(entry)
+
+        self._texts_written = history.num_texts
+        self._records_written = len(history)
+
+    def _append(self, entry: Dict):
+        line = json.dumps(entry, ensure_ascii=False)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def restore(self, spore, variant_cls) -> Optional[str]:
+        """
+        把检查点回放到 spore 上
+
+        Returns:
+            运行的初始提示词；文件不存在或没有完整的代时返回 None
+        """
+        header, generations, valid_end = load_checkpoint(self.path)
+        if header is None or not generations:
+            return None
+
+        # 截掉崩溃时写了一半的行，后续追加从完整记录之后开始
+        if valid_end < os.path.getsize(self.path):
+            with open(self.path, "r+b") as f:
+                f.truncate(valid_end)
+
+        series = []
+        for entry in generations:
+            spore.history.restore(entry["texts"], entry["records"])
+            for record_id, fitness, evaluated in entry["updates"]:
+                spore.history.restore_update(record_id, fitness, evaluated)
+            if entry["generation_stats"] is not None:
+                series.append(entry["generation_stats"])
+
+        last = generations[-1]
+        spore.population = [_restore_variant(variant_cls, spore, s) for s in last["population"]]
+        pending = last.get("pending")
+        if pending:
+            population = spore.population
+            spore._pending_reproduction = (
+                population[pending["elite"]], [population[i] for i in pending["parents"]], None
+            )
+        spore.best_variant = _restore_variant(variant_cls, spore, last["best"]) if last["best"] else None
+        spore.stats.restore(last["stats"], series)
+        random.setstate(_to_tuple(last["rng_state"]))
+
+        self._texts_written = spore.history.num_texts
+        self._records_written = len(spore.history)
+        self.attach(spore)
+        return header["prompt"]
+
+
+def load_checkpoint(path: str):
+    """
+    读取检查点文件
+
+    Returns:
+        (header, 完整的 generation 条目列表, 最后一个完整行之后的字节偏移)；
+        末尾写了一半的行被忽略
+    """
+    header = None
+    generations: List[Dict] = []
+    valid_end = 0
+    if not os.path.exists(path):
+        return header, generations, valid_end
+
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                entry = json.loads(line.decode("utf-8"))
+            except ValueError:
+                break
+            valid_end += len(line)
+            if entry.get("type") == "header":
+                header = entry
+            elif entry.get("type") == "generation":
+                generations.append(entry)
+    return header, generations, valid_end
+
+
+def _pending_state(spore) -> Optional[Dict]:
+    """推迟的繁殖: 精英和父代在当前种群中的下标"""
+    if spore._pending_reproduction is None:
+        return None
+    elite, parents, _ = spore._pending_reproduction
+    index = {id(v): i for i, v in enumerate(spore.population)}
+    return {"elite": index[id(elite)], "parents": [index[id(p)] for p in parents]}
+
+
+def _variant_state(variant) -> Dict:
+    return {
+        "id": variant.id,
+        "fitness": variant.fitness,
+        "evaluated": variant.evaluated,
+        "num_cases": variant.num_cases,
+        "fitness_ci": list(variant.fitness_ci) if variant.fitness_ci else None,
+        "generation": variant.generation,
+        "parent_id": variant.parent_id,
+        "mutations": variant.mutations,
+        "metadata": variant.metadata,
+    }
+
+
+def _restore_variant(variant_cls, spore, state: Dict):
+    return variant_cls(
+        content=spore.history.text(state["id"]),
+        fitness=state["fitness"],
+        evaluated=state["evaluated"],
+        num_cases=state["num_cases"],
+        fitness_ci=tuple(state["fitness_ci"]) if state["fitness_ci"] else None,
+        generation=state["generation"],
+        id=state["id"],
+        parent_id=state["parent_id"],
+        mutations=state["mutations"],
+        metadata=state["metadata"],
+    )
@@ -0,0 +1,127 @@
+"""
+Spore Compact - 反馈去重与上下文压缩
+按 problem / actual 的 MinHash 近似度把反馈聚类，每类保留代表条目，
+按严重程度与出现次数排序后装入固定的 token 预算
+"""
+
+import math
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+from spore_pareto import token_counter
+from spore_similarity import NearDuplicateIndex
+
+
+@dataclass
+class CompactionConfig:
+    """
+    反馈压缩配置
+
+    token_budget: 反馈部分的 token 上限 (代表条目按权重从高到低装入，装不下的只计数)
+    threshold: problem + actual 的估计 Jaccard 相似度不低于此值归为同一类
+    max_field_chars: 单个字段 (期望 / 实际 / 问题) 的最大字符数，超出截断
+    gene_chars: 进化上下文中每个基因展示的最大字符数；None 表示完整展示
+    count_tokens: 自定义计数函数；为 None 时按 model 用 tiktoken (未安装则近似计数)
+    """
+    token_budget: int = 2000
+    threshold: float = 0.5
+    max_field_chars: int = 500
+    gene_chars: Optional[int] = None
+    model: Optional[str] = None
+    count_tokens: Optional[Callable[[str], int]] = None
+    num_perm: int = 64
+    bands: int = 32
+
+
+@dataclass
+class FeedbackCluster:
+    """一类近似反馈: representative 为其中严重程度最高的一条 (同级取最新)"""
+    representative: object
+    count: int = 1
+    max_severity: int = 1
+    members: List = field(default_factory=list)
+
+    @property
+    def weight(self) -> float:
+        """严重程度 × (1 + ln 次数)：次数的作用递减，单条高严重度反馈不会被大量轻微反馈淹没"""
+        return self.max_severity * (1.0 + math.log(self.count))
+
+
+def _signature_text(feedback) -> str:
+    return f"{feedback.problem}\n{feedback.actual}"
+
+
+def truncate(text: str, limit: Optional[int]) -> str:
+    if limit is None or len(text) <= limit:
+        return text
+    return text[:limit] + "..."
+
+
+class FeedbackCompactor:
+    """
+    反馈压缩器
+
+    使用:
+        compactor = FeedbackCompactor(CompactionConfig(token_budget=1500))
+        clusters = compactor.cluster(feedback)
+        text = compactor.compact(feedback, render=lambda i, cluster: ...)
+    """
+
+    def __init__(self, config: Optional[CompactionConfig] = None):
+        self.config = config or CompactionConfig()
+        self._count_tokens = self.config.count_tokens or token_counter(self.config.model)
+
+    def count_tokens(self, text: str) -> int:
+        return self._count_tokens(text)
+
+    def cluster(self, feedback: List) -> List[FeedbackCluster]:
+        """贪心聚类: 每条反馈并入最相似的已有类 (LSH 候选)，否则自成一类；按权重降序返回"""
+        config = self.config
+        index = NearDuplicateIndex(config.threshold, config.num_perm, config.bands)
+        clusters: List[FeedbackCluster] = []
+        for item in feedback:
+            text = _signature_text(item)
+            signature = index.hasher.signature(text)
+            match = index.query(text, signature=signature)
+            if match is None:
+                index.add(len(clusters), text, value=len(clusters), signature=signature)
+                clusters.append(FeedbackCluster(item, 1, item.severity, [item]))
+                continue
+            cluster = clusters[match[2]]
+            cluster.count += 1
+            cluster.members.append(item)
+            if item.severity >= cluster.max_severity:
+                cluster.max_severity = item.severity
+                cluster.representative = item
+        return sorted(clusters, key=lambda c: c.weight, reverse=True)
+
+    def fit(
+        self,
+        clusters: List[FeedbackCluster],
+        render: Callable[[int, FeedbackCluster], str],
+        budget: Optional[int] = None
+    ) -> Tuple[List[str], List[FeedbackCluster]]:
+        """按顺序渲染并装入预算，返回 (已装入的文本块, 未装入的类)"""
+        remaining = self.config.token_budget if budget is None else budget
+        blocks: List[str] = []
+        dropped: List[FeedbackCluster] = []
+        for cluster in clusters:
+            block = render(len(blocks), cluster)
+            cost = self.count_tokens(block)
+            if cost <= remaining:
+                blocks.append(block)
+                remaining -= cost
+            else:
+                dropped.append(cluster)
+        return blocks, dropped
+
+    def compact(self, feedback: List, render: Callable[[int, FeedbackCluster], str]) -> str:
+        """聚类 → 按权重装入预算；装不下的类在末尾汇总一行"""
+        clusters = self.cluster(feedback)
+        summary_reserve = 40 if len(clusters) > 1 else 0
+        blocks, dropped = self.fit(clusters, render, self.config.token_budget - summary_reserve)
+        text = "\n".join(blocks)
+        if dropped:
+            text += (f"\n(另有 {len(dropped)} 类、共 {sum(c.count for c in dropped)} 条较低优先级的反馈"
+                     f"因篇幅未列出)\n")
+        return text
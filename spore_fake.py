@@ -0,0 +1,263 @@
+"""
+Spore Fake - 本地确定性 LLM 替身
+不联网即可跑通 PromptSpore / AgentSpore / spore_tool，用于基准测试和离线调试
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Union
+
+from spore_llm import approx_tokens
+
+
+class FakeLLMError(Exception):
+    """替身注入的随机错误"""
+    status_code = 500
+
+
+class FakeRateLimitError(FakeLLMError):
+    """替身注入的限流错误 (HTTP 429)"""
+    status_code = 429
+
+
+def fixed_latency(seconds: float) -> Callable[[random.Random], float]:
+    return lambda rng: seconds
+
+
+def uniform_latency(low: float, high: float) -> Callable[[random.Random], float]:
+    return lambda rng: rng.uniform(low, high)
+
+
+def lognormal_latency(median: float, sigma: float = 0.5) -> Callable[[random.Random], float]:
+    """长尾延迟，接近真实 API 的分布"""
+    return lambda rng: median * math.exp(rng.gauss(0.0, sigma))
+
+
+@dataclass
+class FakeUsage:
+    calls: int = 0
+    errors: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+
+
+def _digest(*parts: str) -> int:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return int.from_bytes(h.digest()[:8], "big")
+
+
+_SUFFIXES = [
+    "请先列出关键假设，再逐步推理。",
+    "回答前先复述用户的真实意图。",
+    "给出结论后，用一句话自我质疑。",
+    "必要时从两个相反的视角分别论证。",
+    "输出保持简洁，避免套话。",
+    "遇到不确定的信息要明确说明。",
+]
+
+
+def default_responder(messages: List[Dict], rng: random.Random) -> str:
+    """
+    按请求内容给出确定性的回答
+
+    - 单条评分请求 → 0-10 的数字
+    - 批量评分请求 → {"scores": [...]} JSON
+    - Agent 基因进化请求 → "### 基因N: 名称" 格式
+    - 逐基因进化请求 → {"current": ..., "rationale": ...} JSON
+    - 基因评审请求 → {"score": 0-10} JSON
+    - 其他 → 取被改写的提示词 (当前基因代码块或最后一条消息)，末尾追加一句
+    """
+    text = _messages_text(messages)
+
+    if "评估专家" in text:
+        items = re.findall(r"^### (\d+)", text, re.MULTILINE)
+        if items and "JSON" in text:
+            return json.dumps({"scores": [{"id": int(i), "score": rng.randint(0, 10)} for i in items]})
+        return str(rng.randint(0, 10))
+
+    if "基因评审专家" in text:
+        return json.dumps({"score": rng.randint(0, 10)})
+
+    if "下面这一个基因" in text:
+        gene = re.search(r"## 要进化的基因.*?```\n(.*?)\n```", text, re.DOTALL)
+        base = gene.group(1).strip() if gene else ""
+        suffix = rng.choice(_SUFFIXES)
+        return json.dumps({"current": f"{base}\n{suffix}", "rationale": f"补充: {suffix}"}, ensure_ascii=False)
+
+    if "基因进化引擎" in text:
+        section = text.split("## Agent 当前基因", 1)[-1].split("\n## ", 1)[0]
+        names = re.findall(r"^- ([^:\n]+):", section, re.MULTILINE)
+        return "\n\n".join(
+            f"### 基因{i + 1}: {name}\n{rng.choice(_SUFFIXES)}"
+            for i, name in enumerate(names or ["unknown"])
+        )
+
+    gene = re.search(r"当前基因\n```\n(.*?)\n```", text, re.DOTALL)
+    base = gene.group(1) if gene else (messages[-1].get("content") or "")
+    return f"{base.strip()}\n{rng.choice(_SUFFIXES)}"
+
+
+class FakeLLM:
+    """
+    确定性 LLM 替身
+
+    - 输出由 (seed, 请求内容) 决定，与调用顺序和并发无关
+    - 延迟按 latency(rng) 采样，错误按 error_rate / rate_limit_rate 注入
+    - 同时提供三种接口:
+        llm.chat(prompt)                                  AgentSpore / spore_tool 使用
+        llm.chat.completions.create(model=, messages=)    OpenAI 同步接口
+        llm.async_client().chat.completions.create(...)   OpenAI 异步接口 (quick_evolve)
+
+    使用:
+        llm = FakeLLM(latency=lognormal_latency(0.05), error_rate=0.01, seed=42)
+        spore = AgentSpore(llm_client=llm, model="fake")
+    """
+
+    def __init__(
+        self,
+        latency: Union[float, Callable[[random.Random], float]] = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        seed: int = 0,
+        responder: Callable[[List[Dict], random.Random], str] = default_responder,
+    ):
+        self.latency = fixed_latency(latency) if isinstance(latency, (int, float)) else latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.seed = seed
+        self.responder = responder
+
+        self.usage = FakeUsage()
+        self._lock = threading.Lock()
+        self._seen: Dict[int, int] = {}
+
+        self.chat = _ChatEndpoint(self)
+
+    def reset_usage(self):
+        with self._lock:
+            self.usage = FakeUsage()
+            self._seen.clear()
+
+    def async_client(self) -> SimpleNamespace:
+        """OpenAI 异步接口 (AsyncOpenAI 兼容)"""
+        return SimpleNamespace(chat=SimpleNamespace(completions=_AsyncCompletions(self)))
+
+    # ========== 内部 ==========
+
+    def _prepare(self, messages: List[Dict]):
+        """决定本次调用的延迟、错误和回答 (同一内容第 n 次调用结果固定)"""
+        text = _messages_text(messages)
+        key = _digest(str(self.seed), text)
+        with self._lock:
+            occurrence = self._seen.get(key, 0)
+            self._seen[key] = occurrence + 1
+            self.usage.calls += 1
+            self.usage.prompt_tokens += approx_tokens(text)
+
+        call_rng = random.Random(_digest(str(self.seed), text, str(occurrence)))
+        delay = max(0.0, self.latency(call_rng))
+        roll = call_rng.random()
+        if roll < self.rate_limit_rate:
+            return delay, FakeRateLimitError("fake rate limit (429)"), None
+        if roll < self.rate_limit_rate + self.error_rate:
+            return delay, FakeLLMError("fake server error (500)"), None
+
+        # 回答只取决于内容，重试同一请求得到同一回答
+        output = self.responder(messages, random.Random(key))
+        return delay, None, output
+
+    def _begin(self):
+        with self._lock:
+            self.usage.in_flight += 1
+            self.usage.max_in_flight = max(self.usage.max_in_flight, self.usage.in_flight)
+
+    def _finish(self, error: Optional[Exception], output: Optional[str]):
+        with self._lock:
+            self.usage.in_flight -= 1
+            if error is not None:
+                self.usage.errors += 1
+            elif output is not None:
+                self.usage.completion_tokens += approx_tokens(output)
+
+    def complete(self, messages: List[Dict]) -> str:
+        delay, error, output = self._prepare(messages)
+        self._begin()
+        try:
+            time.sleep(delay)
+        except BaseException:
+            self._finish(None, None)
+            raise
+        self._finish(error, output)
+        if error is not None:
+            raise error
+        return output
+
+    async def acomplete(self, messages: List[Dict]) -> str:
+        delay, error, output = self._prepare(messages)
+        self._begin()
+        try:
+            await asyncio.sleep(delay)
+        except BaseException:
+            self._finish(None, None)
+            raise
+        self._finish(error, output)
+        if error is not None:
+            raise error
+        return output
+
+
+def _messages_text(messages: List[Dict]) -> str:
+    return "\n\n".join(m.get("content") or "" for m in messages)
+
+
+def _completion(output: str, prompt_text: str, model: str) -> SimpleNamespace:
+    return SimpleNamespace(
+        model=model,
+        choices=[SimpleNamespace(index=0, finish_reason="stop",
+                                 message=SimpleNamespace(role="assistant", content=output))],
+        usage=SimpleNamespace(prompt_tokens=approx_tokens(prompt_text),
+                              completion_tokens=approx_tokens(output),
+                              total_tokens=approx_tokens(prompt_text) + approx_tokens(output)),
+    )
+
+
+class _Completions:
+    def __init__(self, llm: FakeLLM):
+        self._llm = llm
+
+    def create(self, model: str = "fake", messages: List[Dict] = (), **kwargs) -> SimpleNamespace:
+        output = self._llm.complete(list(messages))
+        return _completion(output, _messages_text(messages), model)
+
+
+class _AsyncCompletions:
+    def __init__(self, llm: FakeLLM):
+        self._llm = llm
+
+    async def create(self, model: str = "fake", messages: List[Dict] = (), **kwargs) -> SimpleNamespace:
+        output = await self._llm.acomplete(list(messages))
+        return _completion(output, _messages_text(messages), model)
+
+
+class _ChatEndpoint:
+    """既可 llm.chat(prompt) 直接调用，也可 llm.chat.completions.create(...)"""
+
+    def __init__(self, llm: FakeLLM):
+        self.completions = _Completions(llm)
+        self._llm = llm
+
+    def __call__(self, prompt: str) -> str:
+        return self._llm.complete([{"role": "user", "content": prompt}])
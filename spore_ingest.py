@@ -0,0 +1,268 @@
+"""
+Spore Ingest - 反馈流式接入
+有界缓冲按基因聚合 EvolutionFeedback，去抖后按数量 / 时间 / 严重程度触发小批量进化；
+进化跟不上时 submit 阻塞 (背压)，把逐任务的进化调用变成可预期、限流的负载
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from agent_spore import AgentGene, AgentSpore, EvolutionFeedback
+
+
+@dataclass
+class IngestConfig:
+    """
+    反馈接入配置
+
+    max_pending: 缓冲中 (含进化中) 的反馈总数上限，达到后 submit 阻塞或拒绝
+    batch_size: 某基因累积到此数量立即触发
+    severity_threshold: 出现严重程度不低于此值的反馈立即触发
+    debounce: 某基因最后一条反馈后静默这么多秒触发 (一阵反馈结束后统一处理)
+    max_wait: 某基因最早一条待处理反馈等待超过这么多秒触发 (持续有反馈时也不会无限推迟)
+    cooldown: 同一基因两次进化开始之间的最短间隔 (秒)；触发条件满足后仍要等冷却结束
+    max_batch: 单次进化最多使用的反馈条数，其余留到下一批
+    max_inflight: 同时进行的进化调用数 (不同基因之间)；同一基因同时只有一次进化
+    """
+    max_pending: int = 10000
+    batch_size: int = 50
+    severity_threshold: int = 5
+    debounce: float = 5.0
+    max_wait: float = 300.0
+    cooldown: float = 0.0
+    max_batch: int = 200
+    max_inflight: int = 2
+
+
+@dataclass
+class _Bucket:
+    """某基因待处理的反馈"""
+    items: List[EvolutionFeedback] = field(default_factory=list)
+    first_at: float = 0.0
+    last_at: float = 0.0
+    max_severity: int = 0
+
+
+class FeedbackIngestor:
+    """
+    反馈流式接入器 - 后台线程聚合反馈并调度进化
+
+    使用:
+        ingestor = FeedbackIngestor(AgentSpore(llm), genes=[AgentGene("system_prompt", prompt, "系统提示词")])
+        with ingestor:
+            ingestor.submit("system_prompt", create_feedback(...))   # 进化跟不上时阻塞
+        ingestor.genes["system_prompt"].current                      # 最新版本
+
+    evolve: (基因, 一批反馈) -> 新基因，默认 spore.evolve_gene(gene, batch, goal)
+    on_evolved: 每次进化完成后回调 (旧基因, 新基因, 这批反馈)，在工作线程中调用
+    """
+
+    def __init__(
+        self,
+        spore: Optional[AgentSpore],
+        genes: List[AgentGene],
+        config: Optional[IngestConfig] = None,
+        goal: str = "实现复杂度与规范性更高、能力更强",
+        evolve: Optional[Callable[[AgentGene, List[EvolutionFeedback]], AgentGene]] = None,
+        on_evolved: Optional[Callable[[AgentGene, AgentGene, List[EvolutionFeedback]], None]] = None
+    ):
+        if evolve is None and spore is None:
+            raise ValueError("需要 spore 或自定义 evolve 函数")
+        self.config = config or IngestConfig()
+        self.genes: Dict[str, AgentGene] = {g.name: g for g in genes}
+        self.goal = goal
+        self._evolve = evolve or (lambda gene, batch: spore.evolve_gene(gene, batch, goal))
+        self.on_evolved = on_evolved
+
+        self._cond = threading.Condition()
+        self._buckets: Dict[str, _Bucket] = {}
+        self._inflight: Dict[str, int] = {}           # 基因 -> 进化中的反馈条数
+        self._last_started: Dict[str, float] = {}
+        self._buffered = 0
+        self._force = False
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        self.counters: Dict[str, int] = {
+            "submitted": 0, "rejected": 0, "batches": 0, "evolved": 0, "errors": 0,
+            "trigger.size": 0, "trigger.severity": 0, "trigger.debounce": 0,
+            "trigger.max_wait": 0, "trigger.flush": 0,
+        }
+        self.errors: List[BaseException] = []
+
+    # ========== 生命周期 ==========
+
+    def start(self) -> "FeedbackIngestor":
+        if self._thread is None:
+            self._executor = ThreadPoolExecutor(max_workers=max(1, self.config.max_inflight))
+            self._thread = threading.Thread(target=self._dispatch, name="spore-ingest", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self, flush: bool = True):
+        """停止接入；flush=True 时先把所有缓冲中的反馈处理完"""
+        if flush and self._thread is not None:
+            self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._executor.shutdown(wait=True)
+            self._thread = None
+
+    def __enter__(self) -> "FeedbackIngestor":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ========== 接入 ==========
+
+    def submit(
+        self,
+        gene_name: str,
+        feedback: EvolutionFeedback,
+        block: bool = True,
+        timeout: Optional[float] = None
+    ) -> bool:
+        """
+        提交一条反馈
+
+        缓冲已满时 (进化跟不上) block=True 阻塞至有空位或超时；超时或 block=False 时
+        拒绝并返回 False。
+        """
+        if gene_name not in self.genes:
+            raise ValueError(f"未知的基因: {gene_name}")
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._buffered >= self.config.max_pending and not self._closed:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if not block or (remaining is not None and remaining <= 0):
+                    self.counters["rejected"] += 1
+                    return False
+                self._cond.wait(remaining)
+            if self._closed:
+                raise RuntimeError("FeedbackIngestor 已关闭")
+
+            now = time.monotonic()
+            bucket = self._buckets.get(gene_name)
+            if bucket is None:
+                bucket = self._buckets[gene_name] = _Bucket(first_at=now)
+            bucket.items.append(feedback)
+            bucket.last_at = now
+            bucket.max_severity = max(bucket.max_severity, feedback.severity)
+            self._buffered += 1
+            self.counters["submitted"] += 1
+            self._cond.notify_all()
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """忽略触发条件 (冷却除外) 立即处理所有缓冲中的反馈，并等待全部进化完成"""
+        if self._thread is None:
+            raise RuntimeError("FeedbackIngestor 尚未 start()")
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._force = True
+            self._cond.notify_all()
+            while self._buffered > 0:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            self._force = False
+            return self._buffered == 0
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return dict(
+                self.counters,
+                buffered=self._buffered,
+                pending={name: len(b.items) for name, b in self._buckets.items() if b.items},
+                inflight=sorted(self._inflight),
+            )
+
+    # ========== 调度 ==========
+
+    def _trigger(self, bucket: _Bucket, now: float) -> Optional[str]:
+        config = self.config
+        if self._force:
+            return "flush"
+        if len(bucket.items) >= config.batch_size:
+            return "size"
+        if bucket.max_severity >= config.severity_threshold:
+            return "severity"
+        if now - bucket.first_at >= config.max_wait:
+            return "max_wait"
+        if now - bucket.last_at >= config.debounce:
+            return "debounce"
+        return None
+
+    def _cooldown_end(self, name: str) -> float:
+        return self._last_started.get(name, float("-inf")) + self.config.cooldown
+
+    def _next_deadline(self, name: str, bucket: _Bucket) -> float:
+        """尚未满足触发条件的基因最早可能触发的时间 (用于调度线程的等待超时)"""
+        due = min(bucket.last_at + self.config.debounce, bucket.first_at + self.config.max_wait)
+        return max(due, self._cooldown_end(name))
+
+    def _dispatch(self):
+        with self._cond:
+            while not self._closed:
+                now = time.monotonic()
+                wake = float("inf")
+                for name, bucket in list(self._buckets.items()):
+                    if not bucket.items or name in self._inflight:
+                        continue
+                    if len(self._inflight) >= self.config.max_inflight:
+                        break
+                    trigger = self._trigger(bucket, now)
+                    ready_at = self._next_deadline(name, bucket) if trigger is None else self._cooldown_end(name)
+                    if ready_at > now:
+                        wake = min(wake, ready_at)
+                        continue
+                    self._start_batch(name, bucket, trigger, now)
+                timeout = None if wake == float("inf") else max(0.0, wake - now)
+                self._cond.wait(timeout)
+
+    def _start_batch(self, name: str, bucket: _Bucket, trigger: str, now: float):
+        """取出一批反馈交给工作线程 (持有锁时调用)"""
+        batch = bucket.items[:self.config.max_batch]
+        rest = bucket.items[len(batch):]
+        if rest:
+            # 剩余反馈沿用原来的 first_at: 它们已经等了这么久，max_wait 不应因拆批而重新计时
+            self._buckets[name] = _Bucket(
+                items=rest, first_at=bucket.first_at, last_at=bucket.last_at,
+                max_severity=max(f.severity for f in rest)
+            )
+        else:
+            del self._buckets[name]
+        self._inflight[name] = len(batch)
+        self._last_started[name] = now
+        self.counters["batches"] += 1
+        self.counters[f"trigger.{trigger}"] += 1
+        self._executor.submit(self._run_batch, name, batch)
+
+    def _run_batch(self, name: str, batch: List[EvolutionFeedback]):
+        gene = self.genes[name]
+        try:
+            evolved = self._evolve(gene, batch)
+            with self._cond:
+                self.genes[name] = evolved
+                self.counters["evolved"] += 1
+            if self.on_evolved is not None:
+                self.on_evolved(gene, evolved, batch)
+        except Exception as e:
+            # 这批反馈丢弃，不影响其他基因；LLM 调用本身的重试由 LLMClient 负责
+            with self._cond:
+                self.counters["errors"] += 1
+                self.errors.append(e)
+        finally:
+            with self._cond:
+                del self._inflight[name]
+                self._buffered -= len(batch)
+                self._cond.notify_all()
@@ -0,0 +1,231 @@
+"""
+Spore Islands - 多进程岛屿模型
+多个独立种群各用自己的评估器和 API key 并行进化，定期迁移优秀个体
+"""
+
+import multiprocessing
+import random
+import traceback
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from spore import PromptVariant
+
+
+@dataclass
+class IslandConfig:
+    """单个岛屿的配置，原样传给 spore_factory"""
+    api_key: Optional[str] = None
+    base_url: Optional[str] = None
+    model: Optional[str] = None
+    seed: Optional[int] = None
+    options: Dict = field(default_factory=dict)
+
+
+@dataclass
+class Migrant:
+    """迁移个体: 内容 + 从源岛种子开始的祖先路径"""
+    content: str
+    fitness: float
+    source: int
+    ancestry: List[str]
+
+
+@dataclass
+class IslandResult:
+    """岛屿进化的合并结果"""
+    best: str
+    fitness: float
+    island: int
+    lineage: List[str]
+    islands: List[Dict]
+
+
+class _Island:
+    """在单个进程内运行的岛屿"""
+
+    def __init__(self, index: int, config: IslandConfig, spore_factory: Callable, prompt: str, test_cases: List):
+        if config.seed is not None:
+            random.seed(config.seed)
+        self.index = index
+        self.prompt = prompt
+        self.test_cases = test_cases
+        self.spore = spore_factory(config)
+        # 迁入个体的谱系 ID -> 在源岛上的祖先路径
+        self.ancestry: Dict[int, List[str]] = {}
+
+    def run(self, generations: int, immigrants: List[Migrant], num_emigrants: int) -> Dict:
+        self._receive(immigrants)
+        self.spore.evolve(self.prompt, self.test_cases, generations=generations, verbose=False)
+        return {
+            "island": self.index,
+            "emigrants": self._emigrants(num_emigrants),
+            "stats": self.spore.get_statistics(),
+        }
+
+    def _receive(self, immigrants: List[Migrant]):
+        """迁入个体替换种群末尾 (精英在首位，不被替换)，在本岛评估器下重新评估"""
+        if not self.spore.population:
+            self.spore.create_initial_population(self.prompt)
+        # 先完成上一轮末代推迟的繁殖，迁入个体再替换新一代的末尾
+        self.spore.reproduce_pending(self.test_cases)
+
+        slots = range(len(self.spore.population) - 1, 0, -1)
+        for slot, migrant in zip(slots, immigrants):
+            variant = PromptVariant(
+                content=migrant.content,
+                generation=0,
+                mutations=[f"migrant:{migrant.source}"],
+                metadata={"source_island": migrant.source, "source_fitness": migrant.fitness},
+            )
+            self.spore.history.add(variant)
+            self.ancestry[variant.id] = migrant.ancestry
+            self.spore.population[slot] = variant
+
+    def lineage(self, record_id: int) -> List[str]:
+        path = self.spore.history.path_to(record_id)
+        texts = [r.content for r in path]
+        inherited = self.ancestry.get(path[0].id)
+        if inherited:
+            texts = inherited[:-1] + texts
+        return texts
+
+    def _emigrants(self, k: int) -> List[Migrant]:
+        evaluated = {}
+        for record in self.spore.history.evaluated():
+            if record.content not in evaluated or record.fitness > evaluated[record.content].fitness:
+                evaluated[record.content] = record
+        top = sorted(evaluated.values(), key=lambda r: r.fitness, reverse=True)[:k]
+        return [Migrant(r.content, r.fitness, self.index, self.lineage(r.id)) for r in top]
+
+    def finish(self) -> Dict:
+        best = self.spore.history.best()
+        return {
+            "island": self.index,
+            "best": best.content if best else self.prompt,
+            "fitness": best.fitness if best else float("-inf"),
+            "lineage": self.lineage(best.id) if best else [self.prompt],
+            "stats": self.spore.get_statistics(),
+        }
+
+
+def _island_worker(index, config, spore_factory, prompt, test_cases, conn):
+    """岛屿进程主循环: 接收 run / finish 指令"""
+    try:
+        island = _Island(index, config, spore_factory, prompt, test_cases)
+        while True:
+            command, *args = conn.recv()
+            if command == "run":
+                conn.send(("ok", island.run(*args)))
+            elif command == "finish":
+                conn.send(("ok", island.finish()))
+                break
+    except Exception:
+        conn.send(("error", traceback.format_exc()))
+    finally:
+        conn.close()
+
+
+class _ProcessIsland:
+    """主进程侧的岛屿代理"""
+
+    def __init__(self, ctx, index, config, spore_factory, prompt, test_cases):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_island_worker,
+            args=(index, config, spore_factory, prompt, test_cases, child_conn),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+    def send(self, *command):
+        self.conn.send(command)
+
+    def receive(self) -> Dict:
+        status, payload = self.conn.recv()
+        if status == "error":
+            raise RuntimeError(f"岛屿进程出错:\n{payload}")
+        return payload
+
+    def close(self):
+        self.conn.close()
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+def evolve_islands(
+    prompt: str,
+    test_cases: List,
+    spore_factory: Callable[[IslandConfig], object],
+    islands: List[IslandConfig],
+    generations: int = 10,
+    migration_interval: int = 2,
+    migrants: int = 2,
+    use_processes: bool = True,
+    verbose: bool = True,
+) -> IslandResult:
+    """
+    岛屿模型进化
+
+    每个岛屿一个进程，由 spore_factory(config) 构建自己的 PromptSpore
+    (评估器、变异策略、API key)。每 migration_interval 代，各岛把最优的 migrants 个
+    变体按环形拓扑迁往下一个岛。结束时合并各岛最佳结果及其跨岛谱系。
+
+    spore_factory 需要是模块顶层函数，以便传给子进程。
+    use_processes=False 时在当前进程内依次运行各岛 (便于调试)。
+    """
+    n = len(islands)
+    if n == 0:
+        raise ValueError("至少需要一个岛屿")
+
+    if use_processes:
+        ctx = multiprocessing.get_context()
+        workers = [_ProcessIsland(ctx, i, cfg, spore_factory, prompt, test_cases) for i, cfg in enumerate(islands)]
+    else:
+        workers = [_Island(i, cfg, spore_factory, prompt, test_cases) for i, cfg in enumerate(islands)]
+
+    def run_epoch(epoch_generations: int, inbound: List[List[Migrant]]) -> List[Dict]:
+        if use_processes:
+            for worker, immigrants in zip(workers, inbound):
+                worker.send("run", epoch_generations, immigrants, migrants)
+            return [worker.receive() for worker in workers]
+        return [worker.run(epoch_generations, immigrants, migrants) for worker, immigrants in zip(workers, inbound)]
+
+    try:
+        inbound: List[List[Migrant]] = [[] for _ in range(n)]
+        done = 0
+        while done < generations:
+            epoch_generations = min(migration_interval, generations - done)
+            reports = run_epoch(epoch_generations, inbound)
+            done += epoch_generations
+
+            # 环形迁移: i -> i + 1
+            inbound = [reports[(i - 1) % n]["emigrants"] if n > 1 else [] for i in range(n)]
+
+            if verbose:
+                bests = ", ".join(
+                    f"#{r['island']}={r['stats'].get('best_fitness', 0):.3f}" for r in reports
+                )
+                print(f"Generation {done}/{generations} | Islands: {bests}")
+
+        if use_processes:
+            for worker in workers:
+                worker.send("finish")
+            finals = [worker.receive() for worker in workers]
+        else:
+            finals = [worker.finish() for worker in workers]
+    finally:
+        if use_processes:
+            for worker in workers:
+                worker.close()
+
+    winner = max(finals, key=lambda f: f["fitness"])
+    return IslandResult(
+        best=winner["best"],
+        fitness=winner["fitness"],
+        island=winner["island"],
+        lineage=winner["lineage"],
+        islands=[{"island": f["island"], "best_fitness": f["fitness"], "stats": f["stats"]} for f in finals],
+    )
@@ -0,0 +1,200 @@
+"""
+Spore Lineage - 紧凑的谱系存储
+提示词文本按内容哈希驻留，父代以 ID 引用，记录以数组列存储
+"""
+
+import hashlib
+from array import array
+from typing import Dict, Iterator, List, Optional
+
+
+class LineageRecord:
+    """谱系记录的只读视图"""
+
+    __slots__ = ("_store", "id")
+
+    def __init__(self, store: "LineageStore", record_id: int):
+        self._store = store
+        self.id = record_id
+
+    @property
+    def content(self) -> str:
+        return self._store.text(self.id)
+
+    @property
+    def parent_id(self) -> Optional[int]:
+        parent = self._store._parent[self.id]
+        return None if parent < 0 else parent
+
+    @property
+    def generation(self) -> int:
+        return self._store._generation[self.id]
+
+    @property
+    def fitness(self) -> float:
+        return self._store._fitness[self.id]
+
+    @property
+    def evaluated(self) -> bool:
+        return bool(self._store._evaluated[self.id])
+
+    @property
+    def mutation(self) -> str:
+        return self._store._ops[self._store._op[self.id]]
+
+    def __repr__(self) -> str:
+        return (f"LineageRecord(id={self.id}, generation={self.generation}, "
+                f"fitness={self.fitness:.3f}, mutation={self.mutation!r})")
+
+
+class LineageStore:
+    """
+    谱系存储
+
+    - 文本按内容哈希驻留，相同提示词只存一份
+    - 每个个体一条定长记录 (文本 ID、父代 ID、代数、适应度、变异算子)
+    - 同一个体重复登记只更新适应度，不产生重复记录
+
+    使用:
+        store = LineageStore()
+        vid = store.add(variant)          # 创建时登记，写回 variant.id
+        store.update(variant)             # 评估后同步适应度
+        store.path_to(best_id)            # 种子 → best 的祖先路径
+    """
+
+    def __init__(self):
+        self._text_ids: Dict[bytes, int] = {}
+        self._texts: List[str] = []
+        self._op_ids: Dict[str, int] = {}
+        self._ops: List[str] = []
+
+        self._text = array("q")
+        self._parent = array("q")
+        self._generation = array("l")
+        self._fitness = array("d")
+        self._evaluated = array("b")
+        self._op = array("l")
+        self.num_evaluated = 0
+
+        # 记录被更新过的个体 ID (开启检查点时使用，None 表示不跟踪)
+        self.dirty: Optional[set] = None
+
+    # ========== 写入 ==========
+
+    def add(self, variant) -> int:
+        """登记新个体，分配并写回 variant.id"""
+        if variant.id is not None:
+            self.update(variant)
+            return variant.id
+
+        record_id = len(self._text)
+        self._text.append(self._intern_text(variant.content))
+        self._parent.append(-1 if variant.parent_id is None else variant.parent_id)
+        self._generation.append(variant.generation)
+        self._fitness.append(variant.fitness)
+        self._evaluated.append(1 if variant.evaluated else 0)
+        self._op.append(self._intern_op(variant.mutations[-1] if variant.mutations else "none"))
+        self.num_evaluated += 1 if variant.evaluated else 0
+
+        variant.id = record_id
+        return record_id
+
+    def update(self, variant):
+        """同步个体的评估结果"""
+        evaluated = 1 if variant.evaluated else 0
+        self.num_evaluated += evaluated - self._evaluated[variant.id]
+        self._fitness[variant.id] = variant.fitness
+        self._evaluated[variant.id] = evaluated
+        if self.dirty is not None:
+            self.dirty.add(variant.id)
+
+    def _intern_text(self, content: str) -> int:
+        digest = hashlib.blake2b(content.encode("utf-8"), digest_size=16).digest()
+        text_id = self._text_ids.get(digest)
+        if text_id is None:
+            text_id = self._text_ids[digest] = len(self._texts)
+            self._texts.append(content)
+        return text_id
+
+    def _intern_op(self, op: str) -> int:
+        op_id = self._op_ids.get(op)
+        if op_id is None:
+            op_id = self._op_ids[op] = len(self._ops)
+            self._ops.append(op)
+        return op_id
+
+    # ========== 序列化 (检查点增量) ==========
+
+    def texts_since(self, start: int) -> List[str]:
+        return self._texts[start:]
+
+    def records_since(self, start: int) -> List[list]:
+        """[文本 ID, 父代 ID, 代数, 适应度, 是否已评估, 变异算子]"""
+        return [
+            [self._text[i], self._parent[i], self._generation[i],
+             self._fitness[i], self._evaluated[i], self._ops[self._op[i]]]
+            for i in range(start, len(self._text))
+        ]
+
+    def restore(self, texts: List[str], records: List[list]):
+        """按写出顺序追加文本和记录，ID 与写出时一致"""
+        for content in texts:
+            self._intern_text(content)
+        for text_id, parent, generation, fitness, evaluated, op in records:
+            self._text.append(text_id)
+            self._parent.append(parent)
+            self._generation.append(generation)
+            self._fitness.append(fitness)
+            self._evaluated.append(evaluated)
+            self._op.append(self._intern_op(op))
+            self.num_evaluated += evaluated
+
+    def restore_update(self, record_id: int, fitness: float, evaluated: int):
+        self.num_evaluated += evaluated - self._evaluated[record_id]
+        self._fitness[record_id] = fitness
+        self._evaluated[record_id] = evaluated
+
+    # ========== 查询 ==========
+
+    def __len__(self) -> int:
+        return len(self._text)
+
+    def __bool__(self) -> bool:
+        return len(self._text) > 0
+
+    def __getitem__(self, record_id: int) -> LineageRecord:
+        if not 0 <= record_id < len(self._text):
+            raise IndexError(record_id)
+        return LineageRecord(self, record_id)
+
+    def __iter__(self) -> Iterator[LineageRecord]:
+        return (LineageRecord(self, i) for i in range(len(self._text)))
+
+    def text(self, record_id: int) -> str:
+        return self._texts[self._text[record_id]]
+
+    @property
+    def num_texts(self) -> int:
+        """不同提示词文本的数量"""
+        return len(self._texts)
+
+    def evaluated(self) -> Iterator[LineageRecord]:
+        return (LineageRecord(self, i) for i in range(len(self._text)) if self._evaluated[i])
+
+    def path_to(self, record_id: int) -> List[LineageRecord]:
+        """从种子到指定个体的祖先路径"""
+        path = []
+        current = record_id
+        while current >= 0:
+            path.append(LineageRecord(self, current))
+            current = self._parent[current]
+        path.reverse()
+        return path
+
+    def best(self) -> Optional[LineageRecord]:
+        """已评估个体中适应度最高者"""
+        best_id = None
+        for i in range(len(self._text)):
+            if self._evaluated[i] and (best_id is None or self._fitness[i] > self._fitness[best_id]):
+                best_id = i
+        return None if best_id is None else LineageRecord(self, best_id)
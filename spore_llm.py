@@ -0,0 +1,838 @@
+"""
+Spore LLM - 统一的 LLM 客户端封装
+响应缓存、连接池、带抖动的指数退避重试和 AIMD 自适应并发；
+spore.py / agent_spore.py / spore_tool.py 都通过 LLMClient 调用模型
+"""
+
+import asyncio
+import hashlib
+import inspect
+import json
+import math
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+import warnings
+import weakref
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass
+class LLMResponse:
+    """一次 LLM 调用的结果"""
+    text: str
+    model: Optional[str] = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached: bool = False
+
+    @property
+    def usage(self) -> SimpleNamespace:
+        """OpenAI 风格的 usage，便于 EvolutionMetrics.record_usage 读取"""
+        return SimpleNamespace(prompt_tokens=self.prompt_tokens, completion_tokens=self.completion_tokens)
+
+
+def is_deterministic(params: Dict) -> bool:
+    """temperature 为 0 的请求结果可复用；未指定 temperature 按采样处理"""
+    return params.get("temperature") == 0
+
+
+def make_request_key(model: Optional[str], messages: List[Dict], params: Dict, slot: Optional[int] = None) -> str:
+    """
+    (模型, 消息, 采样参数) → 缓存键
+
+    采样请求额外带上 slot: 同一请求在本进程内第 n 次发出时使用第 n 个缓存槽，
+    这样跨运行可以复用，而同一次运行内重复变异同一父代仍会得到不同的样本。
+    """
+    payload = json.dumps(
+        {"model": model, "messages": messages, "params": params, "slot": slot},
+        ensure_ascii=False, sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    LLM 响应缓存 - 内存 LRU + 可选 SQLite 持久层
+
+    ttl: 条目存活秒数 (None 不过期)；max_disk_entries: 持久层条目上限，超出时按最近访问淘汰
+
+    使用:
+        cache = LLMResponseCache(max_size=4096, db_path="llm.db", ttl=7 * 86400)
+        quick_evolve(..., llm_cache=cache)
+        AgentSpore(llm_client=client, cache=cache, model="gpt-4")
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        db_path: Optional[str] = None,
+        ttl: Optional[float] = None,
+        max_disk_entries: Optional[int] = None
+    ):
+        self.max_size = max_size
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._memory: "OrderedDict[str, Tuple[Dict, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+            self._db.commit()
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl is not None and now - created > self.ttl
+
+    def get(self, key: str) -> Optional[LLMResponse]:
+        """查询缓存，未命中或已过期返回 None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created = entry
+                if not self._expired(created, now):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return LLMResponse(cached=True, **value)
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    if self._expired(row[1], now):
+                        self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                        self._db.commit()
+                    else:
+                        value = json.loads(row[0])
+                        self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                        self._remember(key, value, row[1])
+                        self.hits += 1
+                        return LLMResponse(cached=True, **value)
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, response: LLMResponse):
+        """写入缓存"""
+        value = {
+            "text": response.text,
+            "model": response.model,
+            "prompt_tokens": response.prompt_tokens,
+            "completion_tokens": response.completion_tokens,
+        }
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), now, now)
+                )
+                self._evict_disk(now)
+                self._db.commit()
+
+    def _remember(self, key: str, value: Dict, created: float):
+        if self.max_size <= 0:
+            return
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, now: float):
+        if self.ttl is not None:
+            self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        if self.max_disk_entries is not None:
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_disk_entries,)
+            )
+
+    def clear(self):
+        """清空内存层 (持久层保留)"""
+        with self._lock:
+            self._memory.clear()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._memory),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+# ========== 重试与限流 ==========
+
+_TRANSIENT_ERRORS = ("APIConnectionError", "APITimeoutError", "InternalServerError",
+                     "ServiceUnavailableError", "OverloadedError")
+
+
+def _status_code(exc: Exception) -> Optional[int]:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_rate_limit(exc: Exception) -> bool:
+    return _status_code(exc) == 429 or "RateLimit" in type(exc).__name__
+
+
+def is_retryable(exc: Exception) -> bool:
+    """限流、5xx、超时和连接错误可重试；其余 (4xx、参数错误等) 直接抛出"""
+    if is_rate_limit(exc):
+        return True
+    status = _status_code(exc)
+    if status is not None:
+        return status >= 500 or status in (408, 409)
+    return isinstance(exc, (ConnectionError, TimeoutError)) or type(exc).__name__ in _TRANSIENT_ERRORS
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class RetryPolicy:
+    """
+    带抖动的指数退避
+
+    第 n 次重试前等待 uniform(0, min(max_delay, base_delay * 2^n)) 秒 (full jitter)；
+    服务端给出 Retry-After 时至少等待该时长。
+    """
+    max_retries: int = 5
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+
+    def delay(self, attempt: int, exc: Optional[Exception] = None) -> float:
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        hint = _retry_after(exc) if exc is not None else None
+        return max(backoff, min(hint, self.max_delay)) if hint is not None else backoff
+
+
+class AIMDLimiter:
+    """
+    AIMD 自适应并发上限 (线程与事件循环间共享)
+
+    - 成功: 上限每轮 (约 limit 次成功) 加 increase
+    - 限流: 上限乘以 decrease；同一拥塞窗口内 (请求发出早于上次下调) 的多个 429 只下调一次
+    """
+
+    def __init__(
+        self,
+        initial: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        increase: float = 1.0,
+        decrease: float = 0.5
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max(max_limit, min_limit)
+        self.increase = increase
+        self.decrease = decrease
+        self.limit = float(min(max(initial, min_limit), self.max_limit))
+        self.in_flight = 0
+        self.rate_limited = 0
+
+        self._cond = threading.Condition()
+        self._last_decrease = float("-inf")
+        self._async_waiters: deque = deque()
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < max(self.min_limit, int(self.limit))
+
+    def acquire(self) -> float:
+        """阻塞直到有空位；返回发出时间，release 时传回"""
+        with self._cond:
+            while not self._has_capacity():
+                self._cond.wait()
+            self.in_flight += 1
+            return time.monotonic()
+
+    async def aacquire(self) -> float:
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self._has_capacity():
+                    self.in_flight += 1
+                    return time.monotonic()
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            await waiter
+
+    def release(self, started: float, rate_limited: bool = False, cancelled: bool = False):
+        with self._cond:
+            self.in_flight -= 1
+            if rate_limited:
+                self.rate_limited += 1
+                if started >= self._last_decrease:
+                    self.limit = max(self.min_limit, self.limit * self.decrease)
+                    self._last_decrease = time.monotonic()
+            elif not cancelled:
+                self.limit = min(self.max_limit, self.limit + self.increase / max(1.0, self.limit))
+            self._cond.notify_all()
+            waiters, self._async_waiters = self._async_waiters, deque()
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                pass  # 事件循环已关闭
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+# ========== 后端 ==========
+
+class _PerLoop:
+    """每个事件循环一份的对象 (异步 SDK 客户端的连接池绑定事件循环；多个线程可各自运行事件循环)"""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._lock = threading.Lock()
+        self._items: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+    def get(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            item = self._items.get(loop)
+            if item is None:
+                item = self._items[loop] = self.factory()
+            return item
+
+
+class _BackgroundLoop:
+    """
+    进程内常驻的事件循环 (后台守护线程)
+
+    同步代码通过 run_sync 在同一个事件循环上执行协程，绑定事件循环的异步 SDK 客户端
+    (见 _PerLoop) 及其连接池因此在多次调用之间复用，而不是每次 asyncio.run 都新建且不关闭。
+    fork 出的子进程 (岛屿模型) 会重新创建自己的循环。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    def _ensure(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="spore-event-loop", daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+            return self._loop
+
+    def run(self, coro):
+        loop = self._ensure()
+        if threading.current_thread() is self._thread:
+            # 已在常驻循环中 (例如 async 评估函数里又同步调用): 在独立线程中单独运行
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                return pool.submit(asyncio.run, coro).result()
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        try:
+            return future.result()
+        except BaseException:
+            future.cancel()
+            raise
+
+
+_background_loop = _BackgroundLoop()
+
+
+def run_sync(coro):
+    """在进程内常驻的事件循环上运行协程并返回结果 (可从任意线程调用)"""
+    return _background_loop.run(coro)
+
+
+class LLMBackend:
+    """后端基类: (模型, 消息, 参数) → LLMResponse"""
+
+    def complete(self, model, messages, params) -> LLMResponse:
+        raise NotImplementedError
+
+    def honours(self, params: Dict) -> bool:
+        """params 是否全部传给了模型；否则 temperature=0 的结果也不能当作确定性结果复用"""
+        return True
+
+    async def acomplete(self, model, messages, params) -> LLMResponse:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, lambda: self.complete(model, messages, params)
+        )
+
+
+def _openai_response(response, model: Optional[str]) -> LLMResponse:
+    usage = getattr(response, "usage", None)
+    return LLMResponse(
+        text=response.choices[0].message.content or "",
+        model=getattr(response, "model", None) or model,
+        prompt_tokens=(getattr(usage, "prompt_tokens", 0) or 0) if usage is not None else 0,
+        completion_tokens=(getattr(usage, "completion_tokens", 0) or 0) if usage is not None else 0,
+    )
+
+
+class _OpenAIStyleBackend(LLMBackend):
+    """任何提供 chat.completions.create(model=, messages=) 的客户端 (OpenAI SDK、FakeLLM 等)"""
+
+    def __init__(self, client=None, async_client=None, async_factory=None):
+        self.client = client
+        self.async_client = async_client
+        self.async_factory = async_factory
+        self._loop_clients = _PerLoop(async_factory) if async_factory else None
+
+    def complete(self, model, messages, params) -> LLMResponse:
+        if self.client is None:
+            raise ValueError("没有可用的同步客户端")
+        response = self.client.chat.completions.create(model=model, messages=messages, **params)
+        return _openai_response(response, model)
+
+    async def acomplete(self, model, messages, params) -> LLMResponse:
+        client = self._get_async_client()
+        if client is None:
+            # 只有同步客户端时放到线程池中执行
+            return await super().acomplete(model, messages, params)
+        response = await client.chat.completions.create(model=model, messages=messages, **params)
+        return _openai_response(response, model)
+
+    def _get_async_client(self):
+        if self.async_client is not None:
+            return self.async_client
+        if self._loop_clients is None:
+            return None
+        return self._loop_clients.get()
+
+
+class _PromptBackend(LLMBackend):
+    """
+    只提供 chat(prompt) -> str 的客户端
+
+    chat 接受的关键字参数 (max_tokens、temperature 等) 原样传入；不接受的丢弃并警告一次，
+    这类请求也不按确定性请求缓存。
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._accepts = _keyword_names(client.chat)
+        self._warned = False
+
+    def _accepted(self, name: str) -> bool:
+        return self._accepts is None or name in self._accepts
+
+    def honours(self, params: Dict) -> bool:
+        return all(self._accepted(name) for name in params)
+
+    def complete(self, model, messages, params) -> LLMResponse:
+        prompt = "\n\n".join(m.get("content") or "" for m in messages)
+        kwargs = {k: v for k, v in params.items() if self._accepted(k)}
+        if len(kwargs) < len(params) and not self._warned:
+            self._warned = True
+            dropped = sorted(set(params) - set(kwargs))
+            warnings.warn(f"{type(self.client).__name__}.chat() 不接受参数 {dropped}，这些参数不会传给模型",
+                          stacklevel=2)
+        return LLMResponse(text=self.client.chat(prompt, **kwargs), model=model)
+
+
+def _keyword_names(fn) -> Optional[set]:
+    """fn 可接受的关键字参数名；接受 **kwargs 时返回 None (全部接受)"""
+    try:
+        parameters = list(inspect.signature(fn).parameters.values())
+    except (TypeError, ValueError):
+        return set()
+    if any(p.kind is inspect.Parameter.VAR_KEYWORD for p in parameters):
+        return None
+    # 第一个位置参数是 prompt
+    return {p.name for p in parameters[1:]
+            if p.kind in (inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY)}
+
+
+def _sdk_http_client(sdk, max_connections: int, timeout: float, use_async: bool = False):
+    """
+    用 SDK 自带的 HTTP 客户端类 (按 SDK 版本基于 httpx 或 httpx2) 建连接池，连接数上限为 max_connections
+
+    不直接 import httpx: 较新的 SDK 不再依赖它。SDK 太旧、没有 DefaultHttpxClient 时返回 None，
+    由 SDK 使用自己的默认连接池。
+    """
+    factory = getattr(sdk, "DefaultAsyncHttpxClient" if use_async else "DefaultHttpxClient", None)
+    if factory is None:
+        return None
+    default_limits = getattr(getattr(sdk, "_constants", None), "DEFAULT_CONNECTION_LIMITS", None)
+    if default_limits is None:
+        return factory(timeout=timeout)
+    limits = type(default_limits)(max_connections=max_connections, max_keepalive_connections=max_connections)
+    return factory(limits=limits, timeout=timeout)
+
+
+def _sdk_client_kwargs(sdk, max_connections: int, timeout: float, use_async: bool = False) -> Dict:
+    http_client = _sdk_http_client(sdk, max_connections, timeout, use_async)
+    return {"http_client": http_client} if http_client is not None else {}
+
+
+class OpenAIBackend(_OpenAIStyleBackend):
+    """
+    OpenAI 后端 (openai>=1.0)
+
+    同步客户端在进程内复用一个 keep-alive 连接池；异步客户端每个事件循环一个连接池
+    (引擎的异步评估统一跑在 run_sync 的常驻事件循环上，因此跨代复用同一个池)。
+    SDK 自带的重试关闭，统一由 LLMClient 重试。
+    """
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 max_connections: int = 64, timeout: float = 60.0):
+        import openai
+
+        client = openai.OpenAI(
+            api_key=api_key, base_url=base_url, max_retries=0, timeout=timeout,
+            **_sdk_client_kwargs(openai, max_connections, timeout)
+        )
+        super().__init__(client, async_factory=lambda: openai.AsyncOpenAI(
+            api_key=api_key, base_url=base_url, max_retries=0, timeout=timeout,
+            **_sdk_client_kwargs(openai, max_connections, timeout, use_async=True)
+        ))
+
+
+def _anthropic_request(messages: List[Dict], params: Dict) -> Dict:
+    """OpenAI 风格消息 → Anthropic Messages API 参数 (system 单独传，且至少有一条 user 消息)"""
+    system = "\n\n".join(m["content"] for m in messages if m.get("role") == "system")
+    turns = [{"role": m["role"], "content": m["content"]} for m in messages if m.get("role") != "system"]
+    if not turns:
+        turns, system = [{"role": "user", "content": system}], ""
+    request = dict(params)
+    request.setdefault("max_tokens", 1024)
+    request["messages"] = turns
+    if system:
+        request["system"] = system
+    return request
+
+
+def _anthropic_response(response, model: Optional[str]) -> LLMResponse:
+    usage = getattr(response, "usage", None)
+    return LLMResponse(
+        text="".join(getattr(block, "text", "") for block in response.content),
+        model=getattr(response, "model", None) or model,
+        prompt_tokens=getattr(usage, "input_tokens", 0) or 0,
+        completion_tokens=getattr(usage, "output_tokens", 0) or 0,
+    )
+
+
+class AnthropicBackend(LLMBackend):
+    """Anthropic 后端 (anthropic>=0.18)，连接池与重试策略同 OpenAIBackend"""
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 max_connections: int = 64, timeout: float = 60.0):
+        import anthropic
+
+        self.client = anthropic.Anthropic(
+            api_key=api_key, base_url=base_url, max_retries=0, timeout=timeout,
+            **_sdk_client_kwargs(anthropic, max_connections, timeout)
+        )
+        self._loop_clients = _PerLoop(lambda: anthropic.AsyncAnthropic(
+            api_key=api_key, base_url=base_url, max_retries=0, timeout=timeout,
+            **_sdk_client_kwargs(anthropic, max_connections, timeout, use_async=True)
+        ))
+
+    def complete(self, model, messages, params) -> LLMResponse:
+        response = self.client.messages.create(model=model, **_anthropic_request(messages, params))
+        return _anthropic_response(response, model)
+
+    async def acomplete(self, model, messages, params) -> LLMResponse:
+        response = await self._loop_clients.get().messages.create(model=model, **_anthropic_request(messages, params))
+        return _anthropic_response(response, model)
+
+
+BACKENDS = {"openai": OpenAIBackend, "anthropic": AnthropicBackend}
+
+
+def _make_backend(client, async_client=None, async_factory=None) -> LLMBackend:
+    if isinstance(client, LLMBackend):
+        return client
+    chat = getattr(client, "chat", None)
+    if client is None or hasattr(chat, "completions"):
+        return _OpenAIStyleBackend(client, async_client, async_factory)
+    if callable(chat):
+        return _PromptBackend(client)
+    raise TypeError(f"不支持的 LLM 客户端: {type(client).__name__}")
+
+
+# ========== 客户端 ==========
+
+class LLMClient:
+    """
+    统一的 LLM 客户端 - 响应缓存 + 重试 + 自适应并发，同步 / 异步调用
+
+    - temperature=0 的请求按 (模型, 消息, 参数) 缓存；同一请求并发发出时只调用一次
+    - 采样请求按调用序号分槽缓存 (见 make_request_key)
+    - 命中缓存的响应 cached=True，不计入 token 用量
+    - 可重试错误 (429 / 5xx / 超时) 按 retry 退避重试；limiter 在遇到 429 时收缩并发
+
+    使用:
+        llm = create_llm_client("anthropic", model="claude-3-5-sonnet-latest", max_concurrency=16)
+        llm = LLMClient(openai.OpenAI(), model="gpt-4", cache=LLMResponseCache(db_path="llm.db"))
+        llm.chat("你好")
+        llm.complete([{"role": "user", "content": "你好"}], temperature=0).text
+    """
+
+    def __init__(
+        self,
+        client=None,
+        model: Optional[str] = None,
+        cache: Optional[LLMResponseCache] = None,
+        async_client=None,
+        async_factory=None,
+        retry: Optional[RetryPolicy] = None,
+        limiter: Optional[AIMDLimiter] = None,
+        **params
+    ):
+        self.backend = _make_backend(client, async_client, async_factory)
+        self.model = model or (type(client).__name__ if isinstance(self.backend, _PromptBackend) else None)
+        self.cache = cache
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.limiter = limiter
+        self.params = params
+        self.retries = 0
+
+        self._lock = threading.Lock()
+        self._slots: Dict[str, int] = {}
+        self._inflight: Dict[str, threading.Event] = {}
+        self._async_inflight: Dict[Tuple[int, str], asyncio.Event] = {}
+
+    def _key(self, model, messages, params) -> Tuple[str, bool]:
+        deterministic = is_deterministic(params) and self.backend.honours(params)
+        slot = None
+        if not deterministic:
+            base = make_request_key(model, messages, params)
+            with self._lock:
+                slot = self._slots.get(base, 0)
+                self._slots[base] = slot + 1
+        return make_request_key(model, messages, params, slot), deterministic
+
+    def _call(self, model, messages, params) -> LLMResponse:
+        attempt = 0
+        while True:
+            started = self.limiter.acquire() if self.limiter else 0.0
+            try:
+                response = self.backend.complete(model, messages, params)
+            except Exception as e:
+                if self.limiter:
+                    self.limiter.release(started, rate_limited=is_rate_limit(e))
+                if attempt >= self.retry.max_retries or not is_retryable(e):
+                    raise
+                delay = self.retry.delay(attempt, e)
+            except BaseException:
+                if self.limiter:
+                    self.limiter.release(started, cancelled=True)
+                raise
+            else:
+                if self.limiter:
+                    self.limiter.release(started)
+                return response
+            attempt += 1
+            with self._lock:
+                self.retries += 1
+            time.sleep(delay)
+
+    async def _acall(self, model, messages, params) -> LLMResponse:
+        attempt = 0
+        while True:
+            started = await self.limiter.aacquire() if self.limiter else 0.0
+            try:
+                response = await self.backend.acomplete(model, messages, params)
+            except Exception as e:
+                if self.limiter:
+                    self.limiter.release(started, rate_limited=is_rate_limit(e))
+                if attempt >= self.retry.max_retries or not is_retryable(e):
+                    raise
+                delay = self.retry.delay(attempt, e)
+            except BaseException:
+                # 取消 / 中断: 归还名额但不调整上限
+                if self.limiter:
+                    self.limiter.release(started, cancelled=True)
+                raise
+            else:
+                if self.limiter:
+                    self.limiter.release(started)
+                return response
+            attempt += 1
+            with self._lock:
+                self.retries += 1
+            await asyncio.sleep(delay)
+
+    def _prepare(self, messages, model, params):
+        model = model or self.model
+        merged = dict(self.params, **params)
+        return model, list(messages), merged
+
+    def complete(self, messages: List[Dict], model: Optional[str] = None, **params) -> LLMResponse:
+        model, messages, params = self._prepare(messages, model, params)
+        if self.cache is None:
+            return self._call(model, messages, params)
+
+        key, deterministic = self._key(model, messages, params)
+        hit = self.cache.get(key)
+        if hit is not None:
+            return hit
+        if not deterministic:
+            response = self._call(model, messages, params)
+            self.cache.put(key, response)
+            return response
+
+        # 同一确定性请求只让一个线程真正调用，其余等待结果
+        with self._lock:
+            event = self._inflight.get(key)
+            owner = event is None
+            if owner:
+                event = self._inflight[key] = threading.Event()
+        if not owner:
+            event.wait()
+            hit = self.cache.get(key)
+            if hit is not None:
+                return hit
+            return self.complete(messages, model, **params)
+        try:
+            response = self._call(model, messages, params)
+            self.cache.put(key, response)
+            return response
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            event.set()
+
+    async def acomplete(self, messages: List[Dict], model: Optional[str] = None, **params) -> LLMResponse:
+        model, messages, params = self._prepare(messages, model, params)
+        if self.cache is None:
+            return await self._acall(model, messages, params)
+
+        key, deterministic = self._key(model, messages, params)
+        hit = self.cache.get(key)
+        if hit is not None:
+            return hit
+        if not deterministic:
+            response = await self._acall(model, messages, params)
+            self.cache.put(key, response)
+            return response
+
+        inflight_key = (id(asyncio.get_running_loop()), key)
+        event = self._async_inflight.get(inflight_key)
+        if event is not None:
+            await event.wait()
+            hit = self.cache.get(key)
+            if hit is not None:
+                return hit
+            return await self.acomplete(messages, model, **params)
+        event = self._async_inflight[inflight_key] = asyncio.Event()
+        try:
+            response = await self._acall(model, messages, params)
+            self.cache.put(key, response)
+            return response
+        finally:
+            del self._async_inflight[inflight_key]
+            event.set()
+
+    def chat(self, prompt: str, **params) -> str:
+        """单条用户消息 → 回答文本 (AgentSpore / spore_tool 使用的接口)"""
+        return self.complete([{"role": "user", "content": prompt}], **params).text
+
+
+def extract_json(text: str):
+    """从 LLM 回复中取出 JSON (允许包裹在 ``` 代码块或说明文字里)；取不到时返回 None"""
+    text = (text or "").strip()
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    for open_char, close_char in (("{", "}"), ("[", "]")):
+        start, end = text.find(open_char), text.rfind(close_char)
+        if start != -1 and end > start:
+            try:
+                return json.loads(text[start:end + 1])
+            except ValueError:
+                continue
+    return None
+
+
+def is_async_callable(fn) -> bool:
+    """判断是否为 async def (含定义了 async __call__ 的对象)"""
+    return inspect.iscoroutinefunction(fn) or inspect.iscoroutinefunction(getattr(fn, "__call__", None))
+
+
+def approx_tokens(text: str) -> int:
+    """粗略的 token 数: 中日韩字符各算 1 个，其余按 4 个字符 1 个"""
+    cjk = len(re.findall(r"[\u3000-\u9fff\uac00-\ud7af\uff00-\uffef]", text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def as_llm_client(
+    client,
+    cache: Optional[LLMResponseCache] = None,
+    model: Optional[str] = None
+) -> LLMClient:
+    """
+    把 OpenAI 兼容客户端或 chat(prompt) 客户端包装成 LLMClient；已是 LLMClient 时原样返回
+
+    OpenAI 兼容客户端的请求必须带 model，未指定时报错 (否则每次请求都以 model=None 发出)。
+    """
+    if isinstance(client, LLMClient):
+        return client
+    llm = LLMClient(client, model=model, cache=cache)
+    if llm.model is None:
+        raise ValueError("OpenAI 兼容客户端需要指定 model")
+    return llm
+
+
+def create_llm_client(
+    provider: str = "openai",
+    model: Optional[str] = None,
+    api_key: Optional[str] = None,
+    base_url: Optional[str] = None,
+    cache: Optional[LLMResponseCache] = None,
+    max_concurrency: int = 8,
+    retry: Optional[RetryPolicy] = None,
+    max_connections: int = 64,
+    **params
+) -> LLMClient:
+    """按 provider ("openai" / "anthropic") 创建带连接池、重试和 AIMD 并发控制的客户端"""
+    if provider not in BACKENDS:
+        raise ValueError(f"未知的 LLM 提供方: {provider}")
+    backend = BACKENDS[provider](api_key=api_key, base_url=base_url, max_connections=max_connections)
+    limiter = AIMDLimiter(initial=max_concurrency, max_limit=max_concurrency)
+    return LLMClient(backend, model=model, cache=cache, retry=retry, limiter=limiter, **params)
@@ -0,0 +1,152 @@
+"""
+Spore Matrix - 变体 × 测试用例 分数矩阵与向量化选择算子
+"""
+
+import random
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+
+
+def _case_key(case) -> Tuple[str, str]:
+    return (case.input, case.expected)
+
+
+def make_rng() -> np.random.Generator:
+    """从 random 模块派生 numpy 随机数生成器，random.seed() 同样控制它"""
+    return np.random.default_rng(random.getrandbits(64))
+
+
+class ScoreMatrix:
+    """
+    变体 × 测试用例 分数矩阵
+
+    行按提示词内容去重，列按 (input, expected) 去重；未评估的格子为 NaN。
+    行列容量按倍数增长，追加变体不需要整体复制。
+    """
+
+    def __init__(self):
+        self._rows: Dict[str, int] = {}
+        self._cols: Dict[Tuple[str, str], int] = {}
+        self._scores = np.full((16, 0), np.nan)
+        self._weights = np.zeros(0)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return (len(self._rows), len(self._cols))
+
+    @property
+    def scores(self) -> np.ndarray:
+        return self._scores[:len(self._rows), :len(self._cols)]
+
+    @property
+    def weights(self) -> np.ndarray:
+        return self._weights[:len(self._cols)]
+
+    def cols_for(self, test_cases: Sequence) -> np.ndarray:
+        """测试用例 → 列号 (新用例追加列，权重同步为 TestCase.weight)"""
+        cols = np.empty(len(test_cases), dtype=np.intp)
+        for i, case in enumerate(test_cases):
+            key = _case_key(case)
+            col = self._cols.get(key)
+            if col is None:
+                col = self._cols[key] = len(self._cols)
+                self._reserve(len(self._rows), col + 1)
+            self._weights[col] = case.weight
+            cols[i] = col
+        return cols
+
+    def rows_for(self, contents: Sequence[str]) -> np.ndarray:
+        """提示词内容 → 行号 (新内容追加行)"""
+        rows = np.empty(len(contents), dtype=np.intp)
+        for i, content in enumerate(contents):
+            row = self._rows.get(content)
+            if row is None:
+                row = self._rows[content] = len(self._rows)
+                self._reserve(row + 1, len(self._cols))
+            rows[i] = row
+        return rows
+
+    def _reserve(self, num_rows: int, num_cols: int):
+        cap_rows, cap_cols = self._scores.shape
+        if num_rows <= cap_rows and num_cols <= cap_cols:
+            return
+        new_rows = max(cap_rows, 16)
+        while new_rows < num_rows:
+            new_rows *= 2
+        new_cols = max(cap_cols, 1)
+        while new_cols < num_cols:
+            new_cols *= 2
+        grown = np.full((new_rows, new_cols), np.nan)
+        grown[:cap_rows, :cap_cols] = self._scores
+        self._scores = grown
+        weights = np.zeros(new_cols)
+        weights[:len(self._weights)] = self._weights
+        self._weights = weights
+
+    def missing(self, rows: np.ndarray, cols: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """返回 rows × cols 中尚未评估的格子 (行号, 列号)"""
+        sub = self._scores[np.ix_(rows, cols)]
+        r, c = np.nonzero(np.isnan(sub))
+        return rows[r], cols[c]
+
+    def record(self, rows: np.ndarray, cols: np.ndarray, values: Sequence[float]):
+        self._scores[rows, cols] = values
+
+    def fitness(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """指定列上的加权均值，未评估的格子不参与；整行无数据时为 NaN"""
+        sub = self._scores[np.ix_(rows, cols)]
+        w = np.where(np.isnan(sub), 0.0, self._weights[cols])
+        total = w.sum(axis=1)
+        weighted = np.nansum(sub * w, axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(total > 0, weighted / total, np.nan)
+
+    def counts(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """指定列上已评估的用例数"""
+        return (~np.isnan(self._scores[np.ix_(rows, cols)])).sum(axis=1)
+
+
+# ========== 向量化选择算子 ==========
+
+def top_k(fitness: np.ndarray, k: int) -> np.ndarray:
+    """argpartition 取前 k 名 (按适应度降序)，不对整个种群排序"""
+    k = min(k, len(fitness))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    idx = np.argpartition(-fitness, k - 1)[:k]
+    return idx[np.argsort(-fitness[idx], kind="stable")]
+
+
+def tournament(fitness: np.ndarray, k: int, size: int = 3, rng: np.random.Generator = None) -> np.ndarray:
+    """锦标赛选择: k 场比赛一次性抽样，每场取适应度最高者"""
+    rng = rng or make_rng()
+    n = len(fitness)
+    entrants = rng.integers(0, n, size=(k, min(size, n)))
+    winners = np.argmax(fitness[entrants], axis=1)
+    return entrants[np.arange(k), winners]
+
+
+def lexicase(scores: np.ndarray, k: int, epsilon: float = 0.0, rng: np.random.Generator = None) -> np.ndarray:
+    """
+    (epsilon-)lexicase 选择
+
+    每次选择随机打乱用例顺序，逐个用例只保留该用例上最优 (差距不超过 epsilon) 的候选。
+    未评估的格子视为最差；整列无数据的用例跳过。
+    """
+    rng = rng or make_rng()
+    n, m = scores.shape
+    filled = np.where(np.isnan(scores), -np.inf, scores)
+    usable = np.nonzero(~np.isnan(scores).all(axis=0))[0]
+
+    selected = np.empty(k, dtype=np.intp)
+    for i in range(k):
+        candidates = np.arange(n)
+        for case in rng.permutation(usable):
+            column = filled[candidates, case]
+            candidates = candidates[column >= column.max() - epsilon]
+            if len(candidates) == 1:
+                break
+        selected[i] = rng.choice(candidates)
+    return selected
+
@@ -0,0 +1,201 @@
+"""
+Spore Metrics - 进化循环的事件钩子与分阶段计量
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+class EvolutionHooks:
+    """
+    进化事件钩子基类 - 按需覆盖
+
+    使用:
+        class MyHooks(EvolutionHooks):
+            def on_generation_end(self, spore, generation, stats):
+                print(generation, stats.best)
+
+        spore.add_hook(MyHooks())
+    """
+
+    def on_generation_start(self, spore, generation: int):
+        pass
+
+    def on_evaluate(self, spore, variants: List, elapsed: float):
+        pass
+
+    def on_mutate(self, spore, parent, child, elapsed: float):
+        pass
+
+    def on_select(self, spore, parents: List, elapsed: float):
+        pass
+
+    def on_generation_end(self, spore, generation: int, stats):
+        pass
+
+
+# ========== 输出端 ==========
+
+class MetricsSink:
+    """计量输出端基类"""
+
+    def emit(self, snapshot: Dict):
+        raise NotImplementedError
+
+
+class InMemorySink(MetricsSink):
+    """保存在内存中，便于测试和仪表盘读取"""
+
+    def __init__(self):
+        self.snapshots: List[Dict] = []
+
+    def emit(self, snapshot: Dict):
+        self.snapshots.append(snapshot)
+
+
+class JsonlSink(MetricsSink):
+    """每代追加一行 JSON"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def emit(self, snapshot: Dict):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(snapshot, ensure_ascii=False) + "\n")
+
+
+class PrometheusTextSink(MetricsSink):
+    """
+    Prometheus 文本格式 (textfile collector)
+
+    每代以累计值整体重写文件 (先写临时文件再原子替换)。
+    """
+
+    def __init__(self, path: str, prefix: str = "spore"):
+        self.path = path
+        self.prefix = prefix
+
+    def emit(self, snapshot: Dict):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(render_prometheus(snapshot["total"], self.prefix))
+        os.replace(tmp, self.path)
+
+
+def render_prometheus(totals: Dict, prefix: str = "spore") -> str:
+    lines = []
+
+    def metric(name: str, kind: str, help_text: str, samples: List):
+        lines.append(f"# HELP {prefix}_{name} {help_text}")
+        lines.append(f"# TYPE {prefix}_{name} {kind}")
+        for labels, value in samples:
+            label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+            lines.append(f"{prefix}_{name}{{{label_text}}} {value}" if label_text else f"{prefix}_{name} {value}")
+
+    stages = totals["stages"]
+    metric("stage_seconds_total", "counter", "Time spent per evolution stage.",
+           [({"stage": s}, v["seconds"]) for s, v in sorted(stages.items())])
+    metric("stage_calls_total", "counter", "Invocations per evolution stage.",
+           [({"stage": s}, v["calls"]) for s, v in sorted(stages.items())])
+    metric("events_total", "counter", "Counted events (LLM calls, cache hits, ...).",
+           [({"name": k}, v) for k, v in sorted(totals["counters"].items())])
+    metric("tokens_total", "counter", "LLM tokens used per stage.",
+           [({"stage": s, "kind": kind}, n)
+            for s, by_kind in sorted(totals["tokens"].items()) for kind, n in sorted(by_kind.items())])
+    metric("generations_total", "counter", "Completed generations.", [({}, totals["generations"])])
+    if totals.get("best_fitness") is not None:
+        metric("best_fitness", "gauge", "Best fitness so far.", [({}, totals["best_fitness"])])
+    return "\n".join(lines) + "\n"
+
+
+# ========== 计量 ==========
+
+def _empty():
+    return {"stages": {}, "counters": {}, "tokens": {}}
+
+
+class EvolutionMetrics:
+    """
+    分阶段计量: 耗时、调用次数、计数器和 token 用量
+
+    每代结束时把本代增量和累计值推送给所有输出端。可在评估线程中调用，内部加锁。
+    """
+
+    def __init__(self, sinks: Optional[List[MetricsSink]] = None):
+        self.sinks: List[MetricsSink] = list(sinks or [])
+        self._lock = threading.Lock()
+        self._total = _empty()
+        self._current = _empty()
+        self.generations = 0
+
+    def add_sink(self, sink: MetricsSink):
+        self.sinks.append(sink)
+
+    @contextmanager
+    def stage(self, name: str):
+        """计时一个阶段"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, stage: str, seconds: float):
+        with self._lock:
+            for bucket in (self._total, self._current):
+                entry = bucket["stages"].setdefault(stage, {"seconds": 0.0, "calls": 0, "max": 0.0})
+                entry["seconds"] += seconds
+                entry["calls"] += 1
+                entry["max"] = max(entry["max"], seconds)
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            for bucket in (self._total, self._current):
+                bucket["counters"][name] = bucket["counters"].get(name, 0) + n
+
+    def record_tokens(self, stage: str, prompt_tokens: int = 0, completion_tokens: int = 0):
+        """记录一次 LLM 调用的 token 用量"""
+        with self._lock:
+            for bucket in (self._total, self._current):
+                tokens = bucket["tokens"].setdefault(stage, {"prompt": 0, "completion": 0})
+                tokens["prompt"] += prompt_tokens
+                tokens["completion"] += completion_tokens
+
+    def record_usage(self, stage: str, response):
+        """从 OpenAI 风格的响应中读取 usage (没有则只计调用次数)；命中响应缓存的只计缓存命中"""
+        if getattr(response, "cached", False):
+            self.count(f"llm_cache_hits.{stage}")
+            return
+        self.count(f"llm_calls.{stage}")
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            self.record_tokens(stage, getattr(usage, "prompt_tokens", 0) or 0,
+                               getattr(usage, "completion_tokens", 0) or 0)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "generation": self.generations,
+                "current": json.loads(json.dumps(self._current)),
+                "total": dict(json.loads(json.dumps(self._total)), generations=self.generations),
+            }
+
+    def end_generation(self, best_fitness: Optional[float] = None) -> Dict:
+        """结束一代: 推送快照并清零本代增量"""
+        with self._lock:
+            self.generations += 1
+        snapshot = self.snapshot()
+        snapshot["total"]["best_fitness"] = best_fitness
+        snapshot["timestamp"] = time.time()
+        for sink in self.sinks:
+            sink.emit(snapshot)
+        with self._lock:
+            self._current = _empty()
+        return snapshot
+
+    def summary(self) -> Dict:
+        return self.snapshot()["total"]
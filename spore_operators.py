@@ -0,0 +1,300 @@
+"""
+Spore Operators - 变异策略基类、零成本本地变异 / 交叉算子与自适应算子选择
+句子 / 小节的删除、重排、去重，以及按 markdown 标题拼接两个父代的小节；
+算子选择概率按观测到的单位开销适应度增益自适应调整 (probability matching)
+"""
+
+import random
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from spore_similarity import hamming, simhash
+
+# 句子: 以中英文句末标点结尾 (含其后空白)，换行单独成一段，保证 "".join(...) 无损还原
+_SENTENCE = re.compile(r"[^。！？!?.\n]+[。！？!?.]*[ \t]*|\n")
+_HEADING = re.compile(r"^#{1,6}[ \t]+\S", re.MULTILINE)
+
+
+def split_sentences(text: str) -> List[str]:
+    """切分为句子与换行符；"".join(结果) == text"""
+    return _SENTENCE.findall(text)
+
+
+def split_sections(text: str) -> List[str]:
+    """
+    按 markdown 标题切分为小节；第一个元素是首个标题之前的前言 (可能为空)
+
+    "".join(结果) == text
+    """
+    starts = [m.start() for m in _HEADING.finditer(text)]
+    bounds = [0] + starts + [len(text)]
+    return [text[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+def section_title(section: str) -> str:
+    """小节标题行 (归一化空白)；前言返回空串"""
+    if not _HEADING.match(section):
+        return ""
+    return " ".join(section.split("\n", 1)[0].split())
+
+
+def _sentence_slots(units: List[str]) -> List[int]:
+    """可操作的句子下标 (跳过换行和标题行)"""
+    return [i for i, unit in enumerate(units) if unit.strip() and not unit.lstrip().startswith("#")]
+
+
+class MutationStrategy:
+    """
+    变异策略基类
+
+    cost: 一次变异的开销，以评估一个子代的开销为单位 (LLM 改写约为 1，本地算子为 0)；
+          自适应算子选择按单位开销的增益给策略记奖励
+    """
+
+    name: str = "base"
+    cost: float = 1.0
+
+    def mutate(self, prompt: str) -> str:
+        raise NotImplementedError
+
+
+class LocalMutation(MutationStrategy):
+    """本地变异算子基类: 不调用 LLM；无法应用时原样返回"""
+
+    name: str = "local"
+    cost: float = 0.0
+
+
+class SentenceDrop(LocalMutation):
+    """随机删除一个句子"""
+
+    name = "sentence_drop"
+
+    def mutate(self, prompt: str) -> str:
+        units = split_sentences(prompt)
+        slots = _sentence_slots(units)
+        if len(slots) < 2:
+            return prompt
+        del units[random.choice(slots)]
+        return "".join(units)
+
+
+class SectionDrop(LocalMutation):
+    """随机删除一个带标题的小节 (至少保留一个)"""
+
+    name = "section_drop"
+
+    def mutate(self, prompt: str) -> str:
+        sections = split_sections(prompt)
+        if len(sections) < 3:
+            return prompt
+        del sections[random.randrange(1, len(sections))]
+        return "".join(sections)
+
+
+class SentenceReorder(LocalMutation):
+    """交换同一段落内两个相邻句子"""
+
+    name = "sentence_reorder"
+
+    def mutate(self, prompt: str) -> str:
+        units = split_sentences(prompt)
+        slots = set(_sentence_slots(units))
+        pairs = [i for i in range(len(units) - 1) if i in slots and i + 1 in slots]
+        if not pairs:
+            return prompt
+        i = random.choice(pairs)
+        first, second = units[i].rstrip(), units[i + 1].rstrip()
+        # 空白留在原位置，只交换句子本身
+        units[i] = second + units[i][len(first):]
+        units[i + 1] = first + units[i + 1][len(second):]
+        return "".join(units)
+
+
+class SectionReorder(LocalMutation):
+    """交换两个带标题的小节"""
+
+    name = "section_reorder"
+
+    def mutate(self, prompt: str) -> str:
+        sections = split_sections(prompt)
+        if len(sections) < 3:
+            return prompt
+        i, j = random.sample(range(1, len(sections)), 2)
+        body = [s.rstrip("\n") for s in sections]
+        tails = [s[len(b):] for s, b in zip(sections, body)]
+        body[i], body[j] = body[j], body[i]
+        return "".join(b + t for b, t in zip(body, tails))
+
+
+class DuplicateRemoval(LocalMutation):
+    """
+    删除重复或近似重复的句子 (保留首次出现)
+
+    max_distance: SimHash 汉明距离不超过此值视为近似重复；0 只删除归一化后完全相同的句子
+    """
+
+    name = "dedupe_sentences"
+
+    def __init__(self, max_distance: int = 3, min_length: int = 8):
+        self.max_distance = max_distance
+        self.min_length = min_length
+
+    def mutate(self, prompt: str) -> str:
+        units = split_sentences(prompt)
+        seen_text = set()
+        seen_hash: List[int] = []
+        kept = []
+        for unit in units:
+            key = " ".join(unit.split()).lower().rstrip("。！？!?.")
+            if not key:
+                kept.append(unit)
+                continue
+            if key in seen_text:
+                continue
+            if self.max_distance and len(key) >= self.min_length:
+                fingerprint = simhash(key)
+                if any(hamming(fingerprint, h) <= self.max_distance for h in seen_hash):
+                    continue
+                seen_hash.append(fingerprint)
+            seen_text.add(key)
+            kept.append(unit)
+        return "".join(kept)
+
+
+class SectionCrossover(LocalMutation):
+    """
+    交叉: 在 markdown 标题处拼接两个父代的小节
+
+    两个父代有同名小节时，每个同名小节以 1/2 概率换成另一父代的版本，
+    另一父代独有的小节以 1/2 概率追加；没有同名小节时做单点交叉。
+    另一父代由引擎每代通过 set_mates() 提供 (本代选出的父代)。
+    """
+
+    name = "section_crossover"
+    arity = 2
+
+    def __init__(self):
+        self._mates: List[str] = []
+
+    def set_mates(self, prompts: List[str]):
+        self._mates = list(prompts)
+
+    def mutate(self, prompt: str) -> str:
+        mates = [m for m in self._mates if m != prompt]
+        if not mates:
+            return prompt
+        return self.crossover(prompt, random.choice(mates))
+
+    def crossover(self, a: str, b: str) -> str:
+        sections_a, sections_b = split_sections(a), split_sections(b)
+        titled_b = {section_title(s): s for s in sections_b[1:]}
+        titles_a = {section_title(s) for s in sections_a[1:]}
+
+        if titles_a & set(titled_b):
+            child = [sections_a[0]]
+            for section in sections_a[1:]:
+                title = section_title(section)
+                swap = title in titled_b and random.random() < 0.5
+                child.append(titled_b[title] if swap else section)
+            for title, section in titled_b.items():
+                if title not in titles_a and random.random() < 0.5:
+                    child.append(section)
+        else:
+            cut_a = random.randint(1, len(sections_a))
+            cut_b = random.randint(1, len(sections_b))
+            child = sections_a[:cut_a] + sections_b[cut_b:]
+
+        # 拼接处补换行，避免标题粘在上一节末尾
+        text = ""
+        for section in child:
+            if text and section and not text.endswith("\n"):
+                text += "\n"
+            text += section
+        return text
+
+
+def default_local_operators() -> List[LocalMutation]:
+    """全部内置本地算子"""
+    return [
+        SentenceDrop(),
+        SectionDrop(),
+        SentenceReorder(),
+        SectionReorder(),
+        DuplicateRemoval(),
+        SectionCrossover(),
+    ]
+
+
+@dataclass
+class OperatorSelectionConfig:
+    """
+    自适应算子选择配置 (probability matching)
+
+    p_min: 每个算子的最低选择概率，保证低分算子 (含昂贵的 LLM 算子) 仍有机会
+    decay: 质量估计的学习率，越大越偏重最近的增益
+    initial_quality: 新算子的初始质量估计
+    """
+    p_min: float = 0.05
+    decay: float = 0.3
+    initial_quality: float = 0.01
+
+
+class AdaptiveOperatorSelector:
+    """
+    按观测到的适应度增益调整算子选择概率
+
+    奖励 = max(0, 子代适应度 - 父代适应度) / (1 + cost)：每个子代都要付一次评估，
+    cost 是变异本身的额外开销，奖励即单位开销的增益；质量 q 按 decay 做指数滑动平均，
+    选择概率 p_i = p_min + (1 - K·p_min) · q_i / Σq。
+    """
+
+    def __init__(self, config: Optional[OperatorSelectionConfig] = None):
+        self.config = config or OperatorSelectionConfig()
+        self.quality: Dict[str, float] = {}
+        self.uses: Dict[str, int] = {}
+        self.gains: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def probabilities(self, names: List[str]) -> List[float]:
+        with self._lock:
+            for name in names:
+                self.quality.setdefault(name, self.config.initial_quality)
+            q = [self.quality[name] for name in names]
+        k = len(names)
+        p_min = min(self.config.p_min, 1.0 / k)
+        total = sum(q)
+        if total <= 0:
+            return [1.0 / k] * k
+        return [p_min + (1 - k * p_min) * qi / total for qi in q]
+
+    def choose(self, strategies: List):
+        """按当前概率挑选一个策略 (对象需有 name 属性)"""
+        if not strategies:
+            return None
+        weights = self.probabilities([s.name for s in strategies])
+        return random.choices(strategies, weights=weights)[0]
+
+    def update(self, name: str, gain: float, cost: float = 0.0):
+        """记录一次应用结果 (gain: 适应度增益；cost: 变异开销，见 MutationStrategy.cost)"""
+        gain = max(0.0, gain)
+        reward = gain / (1.0 + max(0.0, cost))
+        with self._lock:
+            q = self.quality.get(name, self.config.initial_quality)
+            self.quality[name] = q + self.config.decay * (reward - q)
+            self.uses[name] = self.uses.get(name, 0) + 1
+            self.gains[name] = self.gains.get(name, 0.0) + gain
+
+    def summary(self, names: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """{算子: {probability, uses, mean_gain}}"""
+        names = names or list(self.quality)
+        return {
+            name: {
+                "probability": p,
+                "uses": self.uses.get(name, 0),
+                "mean_gain": self.gains.get(name, 0.0) / max(1, self.uses.get(name, 0)),
+            }
+            for name, p in zip(names, self.probabilities(names))
+        }
@@ -0,0 +1,115 @@
+"""
+Spore Pareto - 多目标进化 (质量 ↑ / token 长度 ↓)
+NSGA-II 非支配排序与拥挤距离，以及帕累托前沿提取
+"""
+
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from spore_llm import approx_tokens
+
+
+def token_counter(model: Optional[str] = None) -> Callable[[str], int]:
+    """按模型的分词器计数 (需要 tiktoken)；未安装时退回近似计数"""
+    try:
+        import tiktoken
+    except ImportError:
+        return approx_tokens
+    try:
+        encoding = tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("cl100k_base")
+    except KeyError:
+        encoding = tiktoken.get_encoding("cl100k_base")
+    return lambda text: len(encoding.encode(text))
+
+
+@dataclass
+class MultiObjectiveConfig:
+    """
+    多目标配置: 最大化适应度，同时最小化提示词 token 数
+
+    count_tokens: 自定义计数函数；为 None 时按 model 用 tiktoken (未安装则近似计数)
+    """
+    model: Optional[str] = None
+    count_tokens: Optional[Callable[[str], int]] = None
+
+    def counter(self) -> Callable[[str], int]:
+        return self.count_tokens or token_counter(self.model)
+
+
+def dominates(a: np.ndarray, b: np.ndarray) -> bool:
+    """a 支配 b (所有目标都按最小化)"""
+    return bool(np.all(a <= b) and np.any(a < b))
+
+
+def non_dominated_sort(objectives: np.ndarray) -> List[np.ndarray]:
+    """
+    快速非支配排序 (所有目标按最小化)
+
+    Returns:
+        前沿列表，第 0 个是帕累托前沿，每个元素是下标数组
+    """
+    n = len(objectives)
+    if n == 0:
+        return []
+    le = np.all(objectives[:, None, :] <= objectives[None, :, :], axis=2)
+    lt = np.any(objectives[:, None, :] < objectives[None, :, :], axis=2)
+    dominance = le & lt                       # dominance[i, j]: i 支配 j
+    dominated_by = dominance.sum(axis=0)      # 支配 j 的个体数
+
+    fronts = []
+    current = np.flatnonzero(dominated_by == 0)
+    while len(current):
+        fronts.append(current)
+        dominated_by = dominated_by - dominance[current].sum(axis=0)
+        dominated_by[current] = -1
+        current = np.flatnonzero(dominated_by == 0)
+    return fronts
+
+
+def crowding_distance(objectives: np.ndarray) -> np.ndarray:
+    """同一前沿内的拥挤距离；边界个体为无穷大"""
+    n, m = objectives.shape
+    distance = np.zeros(n)
+    if n <= 2:
+        return np.full(n, np.inf)
+    for k in range(m):
+        order = np.argsort(objectives[:, k], kind="stable")
+        values = objectives[order, k]
+        span = values[-1] - values[0]
+        distance[order[0]] = distance[order[-1]] = np.inf
+        if span > 0:
+            distance[order[1:-1]] += (values[2:] - values[:-2]) / span
+    return distance
+
+
+def nsga2_select(objectives: np.ndarray, k: int) -> np.ndarray:
+    """按 (前沿序号, 拥挤距离降序) 选出 k 个下标"""
+    chosen: List[int] = []
+    for front in non_dominated_sort(objectives):
+        if len(chosen) + len(front) <= k:
+            chosen.extend(front.tolist())
+            continue
+        distance = crowding_distance(objectives[front])
+        order = np.argsort(-distance, kind="stable")
+        chosen.extend(front[order[:k - len(chosen)]].tolist())
+        break
+    return np.array(chosen[:k], dtype=int)
+
+
+def pareto_front_2d(fitness: np.ndarray, tokens: np.ndarray) -> np.ndarray:
+    """
+    (适应度 ↑, token 数 ↓) 的帕累托前沿，O(n log n)
+
+    Returns:
+        前沿下标，按 token 数升序
+    """
+    order = np.lexsort((-fitness, tokens))
+    front = []
+    best = -np.inf
+    for i in order:
+        if fitness[i] > best:
+            front.append(i)
+            best = fitness[i]
+    return np.array(front, dtype=int)
@@ -0,0 +1,202 @@
+"""
+Spore Pipeline - 流水线式繁殖
+变异并发执行，子代一产生就开始评估；可在本代评分期间从暂定精英投机变异
+"""
+
+import random
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from spore_cache import make_cache_key
+from spore_similarity import NearDuplicateIndex
+
+
+@dataclass
+class PipelineConfig:
+    """
+    流水线配置
+
+    mutation_workers: 同时进行的变异请求数
+    eager_evaluation: 子代产生后立即在后台评估 (仅全量评估模式；采样 / 竞速 / 逐用例模式下
+                      评估依赖整代一起进行，此项不生效)
+    speculative: 每代评估开始前，从已评估的暂定精英投机发起的变异数；选出的父代用得上时直接
+                 采用，用不上的丢弃 (计入 speculative_discarded)。设置了预算时不投机。
+    """
+    mutation_workers: int = 8
+    eager_evaluation: bool = True
+    speculative: int = 0
+
+
+class GenerationPipeline:
+    """
+    一次 evolve 运行期间的流水线
+
+    变异内容在工作线程中生成；谱系登记、钩子和计数在主线程按完成顺序进行，
+    因此 LineageStore / ScoreMatrix 不需要加锁。
+    """
+
+    def __init__(self, spore, config: PipelineConfig):
+        self.spore = spore
+        self.config = config
+        self._mutations = ThreadPoolExecutor(max_workers=max(1, config.mutation_workers))
+        self._evaluations = ThreadPoolExecutor(max_workers=max(1, spore.max_concurrency))
+        # 父代谱系 ID -> 尚未使用的投机变异 [(策略, future)]
+        self._speculative: Dict[int, List[Tuple[object, Future]]] = {}
+
+    @property
+    def eager(self) -> bool:
+        spore = self.spore
+        return (self.config.eager_evaluation and spore.sampler is None
+                and spore.racing is None and not spore.per_case)
+
+    def speculate(self, population: List, num_parents: int = 3):
+        """评估开始前，从种群中已评估的最优个体 (上一代精英和克隆) 投机发起变异"""
+        if self.config.speculative <= 0:
+            return
+        seen = set()
+        provisional = []
+        for variant in sorted((v for v in population if v.evaluated), key=lambda v: v.fitness, reverse=True):
+            if variant.id not in seen:
+                seen.add(variant.id)
+                provisional.append(variant)
+        provisional = provisional[:num_parents]
+        if not provisional:
+            return
+        self.spore._offer_mates(provisional)
+
+        for i in range(self.config.speculative):
+            parent = provisional[i % len(provisional)]
+            strategy = self.spore._pick_strategy()
+            future = self._mutations.submit(self.spore._mutate_content, strategy, parent)
+            self._speculative.setdefault(parent.id, []).append((strategy, future))
+
+    def reproduce(self, elite, parents: List, test_cases: List, max_mutations: Optional[int] = None) -> List:
+        """
+        与 PromptSpore._reproduce 相同的繁殖规则，但变异并发、子代完成即评估
+
+        同一缓存键的子代共用一次评估；启用近重复检测时与历史近似的按 dedup.action 沿用适应度
+        或重新提交变异，本代内彼此近似的等待先到者的评估结果。
+        """
+        spore = self.spore
+        population = [elite]
+        mutating: Dict[Future, Tuple[int, object, object]] = {}
+        mutations = 0
+        screened: List[Tuple[int, object]] = []
+        screening = spore.surrogate is not None and spore.surrogate.ready
+
+        while len(population) < spore.population_size:
+            parent = random.choice(parents)
+            can_mutate = max_mutations is None or mutations < max_mutations
+            if can_mutate and random.random() < spore.mutation_rate:
+                if screening:
+                    screened.append((len(population), parent))
+                else:
+                    strategy, future = self._take_speculative(parent)
+                    if future is None:
+                        strategy = spore._pick_strategy()
+                        future = self._mutations.submit(spore._mutate_content, strategy, parent)
+                    mutating[future] = (len(population), parent, strategy)
+                population.append(None)
+                mutations += 1
+            else:
+                population.append(spore._clone(parent))
+
+        evaluator_id = spore._get_evaluator_id()
+        similarity = spore.similarity
+        regenerate = (similarity is not None and spore.dedup.action == "regenerate"
+                      and bool(spore.mutation_strategies))
+        # 本代已提交评估的子代: 同一缓存键共用一个 future，近重复的等待代表的结果
+        inflight: Dict[str, Future] = {}
+        batch = (NearDuplicateIndex(spore.dedup.threshold, spore.dedup.num_perm, spore.dedup.bands)
+                 if similarity is not None and self.eager else None)
+        leaders: Dict[int, Tuple[object, Future]] = {}
+        evaluating: List[Tuple[object, Future, Optional[object]]] = []
+        attempts: Dict[int, int] = {}
+        pending = set(mutating)
+
+        def is_duplicate(content, signature) -> bool:
+            return (similarity.query(content, signature) is not None
+                    or (batch is not None and batch.query(content, signature) is not None))
+
+        def accept(slot, parent, strategy, content, elapsed):
+            signature = similarity.hasher.signature(content) if similarity is not None else None
+            if regenerate and attempts.get(slot, 0) < spore.dedup.max_regenerate \
+                    and is_duplicate(content, signature):
+                # 与 _screen_near_duplicates 相同: 丢弃后从同一父代重新变异
+                attempts[slot] = attempts.get(slot, 0) + 1
+                spore.metrics.count("near_duplicates_regenerated")
+                strategy = spore._pick_strategy()
+                future = self._mutations.submit(spore._mutate_content, strategy, parent)
+                mutating[future] = (slot, parent, strategy)
+                pending.add(future)
+                return
+
+            child = spore._register_child(parent, parent.generation + 1, strategy, content, elapsed)
+            population[slot] = child
+            if similarity is not None and spore._inherit_near_duplicate(child, signature):
+                return
+            if not self.eager:
+                return
+            if batch is not None:
+                match = batch.query(content, signature)
+                if match is not None:
+                    leader, future = leaders[match[0]]
+                    evaluating.append((child, future, leader))
+                    spore.metrics.count("near_duplicates")
+                    return
+            key = make_cache_key(content, test_cases, evaluator_id)
+            future = inflight.get(key)
+            if future is None:
+                future = inflight[key] = self._evaluations.submit(spore.score_jobs, [(content, test_cases)])
+            evaluating.append((child, future, None))
+            if batch is not None:
+                batch.add(slot, content, signature=signature)
+                leaders[slot] = (child, future)
+
+        if screened:
+            # 代理模型筛选: 全部候选并发生成后挑出最有希望的
+            plan = spore._plan_candidates([p for _, p in screened], max_mutations)
+            futures = [self._mutations.submit(spore._mutate_content, strategy, parent) for parent, strategy in plan]
+            candidates = [(parent, strategy, *f.result()) for (parent, strategy), f in zip(plan, futures)]
+            for (slot, _), candidate in zip(screened, spore._screen_candidates(candidates, len(screened))):
+                accept(slot, *candidate)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.discard(future)
+                slot, parent, strategy = mutating.pop(future)
+                accept(slot, parent, strategy, *future.result())
+
+        for child, future, leader in evaluating:
+            child.fitness = future.result()[0]
+            child.evaluated = True
+            child.num_cases = len(test_cases)
+            if leader is not None:
+                child.metadata["near_duplicate_of"] = leader.id
+
+        self._discard_speculative()
+        return population
+
+    def _take_speculative(self, parent):
+        queue = self._speculative.get(parent.id)
+        if queue:
+            return queue.pop(0)
+        return None, None
+
+    def _discard_speculative(self):
+        discarded = 0
+        for queue in self._speculative.values():
+            for _, future in queue:
+                if not future.cancel():
+                    discarded += 1
+        self._speculative.clear()
+        if discarded:
+            self.spore.metrics.count("speculative_discarded", discarded)
+
+    def close(self):
+        self._discard_speculative()
+        self._mutations.shutdown(wait=True)
+        self._evaluations.shutdown(wait=True)
+
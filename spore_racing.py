@@ -0,0 +1,100 @@
+"""
+Spore Racing - 竞速评估 (Successive Halving)
+先用少量测试用例给所有变体打分，只让排名靠前的变体继续跑更多用例
+"""
+
+import math
+import random
+from dataclasses import dataclass
+from statistics import NormalDist
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+@dataclass
+class RacingConfig:
+    """竞速评估配置"""
+    initial_cases: int = 8       # 第一轮每个变体评估的用例数
+    eta: float = 2.0             # 每轮保留 1/eta 的变体，用例数扩大 eta 倍
+    min_survivors: int = 2       # 至少保留多少个变体跑完全部用例
+    confidence: float = 0.95     # 置信区间的置信度
+
+
+def confidence_interval(
+    scores: List[float],
+    confidence: float = 0.95,
+    weights: Optional[List[float]] = None
+) -> Tuple[float, float]:
+    """
+    均值的正态近似置信区间；样本不足 2 个时区间无界
+
+    给出 weights 时以加权均值为中心 (与 ScoreMatrix.fitness 一致)，方差取加权方差，
+    样本量取 Kish 有效样本量 (Σw)² / Σw²；权重全相同时与不加权的结果一致。
+    """
+    if weights is None:
+        weights = [1.0] * len(scores)
+    total = sum(weights)
+    n_eff = total ** 2 / sum(w * w for w in weights) if total > 0 else 0.0
+    if len(scores) < 2 or n_eff <= 1:
+        return (float("-inf"), float("inf"))
+    center = sum(w * x for w, x in zip(weights, scores)) / total
+    variance = sum(w * (x - center) ** 2 for w, x in zip(weights, scores)) / total * n_eff / (n_eff - 1)
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    half_width = z * math.sqrt(variance / n_eff)
+    return (center - half_width, center + half_width)
+
+
+def race_population(spore, variants: List, test_cases: List, config: RacingConfig):
+    """
+    对种群做 successive halving 评估
+
+    每个 (变体, 用例) 单独打分，写入 spore.score_matrix 并经过适应度缓存，
+    因此精英和克隆在后续代中重复参赛不产生额外调用。
+    被淘汰的变体保留已评估用例上的加权均值与置信区间。
+    """
+    if not variants or not test_cases:
+        return
+
+    # 全部变体使用同一个随机顺序的用例，保证同一轮内可比
+    order = list(test_cases)
+    random.shuffle(order)
+
+    matrix = spore.score_matrix
+    contents = list(dict.fromkeys(v.content for v in variants))
+    reached = {c: 0 for c in contents}
+    alive = contents
+    used = 0
+    budget = max(1, config.initial_cases)
+
+    while True:
+        target = min(budget, len(order))
+        spore.fill_scores(alive, order[used:target])
+        used = target
+        for c in alive:
+            reached[c] = used
+
+        if used >= len(order):
+            break
+
+        if len(alive) > config.min_survivors:
+            keep = max(config.min_survivors, math.ceil(len(alive) / config.eta))
+            ranked = matrix.fitness(matrix.rows_for(alive), matrix.cols_for(order[:used]))
+            alive = [alive[i] for i in np.argsort(-ranked, kind="stable")[:keep]]
+
+        # 只剩最后几名时直接跑完全部用例
+        if len(alive) <= config.min_survivors:
+            budget = len(order)
+        else:
+            budget = math.ceil(budget * config.eta)
+
+    for variant in variants:
+        n = reached[variant.content]
+        row = matrix.rows_for([variant.content])
+        cols = matrix.cols_for(order[:n])
+        variant.fitness = float(matrix.fitness(row, cols)[0])
+        variant.evaluated = True
+        variant.num_cases = n
+        variant.fitness_ci = confidence_interval(
+            matrix.scores[row[0], cols].tolist(), config.confidence, matrix.weights[cols].tolist()
+        )
@@ -0,0 +1,81 @@
+"""
+Spore Sampling - 小批量测试用例采样
+每代均匀抽取一小批用例，变体的适应度估计跨代累积 (用例权重只在求均值时生效)
+"""
+
+import random
+from collections import defaultdict
+from typing import Callable, Dict, Hashable, List, Optional
+
+
+class TestCaseSampler:
+    """
+    均匀采样小批量用例，可选分层
+
+    使用:
+        sampler = TestCaseSampler(batch_size=16, stratify=lambda tc: tc.expected)
+        spore = PromptSpore(sampler=sampler)
+
+    同一内容的变体在不同代被评估的用例累积在 spore.score_matrix 中，
+    适应度 = 已评估用例上按 weight 加权的均值。
+
+    抽样本身不看 weight: 若按权重抽样再加权求均值，权重会被计入两次，
+    高权重用例的分数被系统性放大 (且已填充的格子跨代复用，偏差不会消失)。
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 16,
+        stratify: Optional[Callable[..., Hashable]] = None,
+    ):
+        self.batch_size = batch_size
+        self.stratify = stratify
+
+    def sample(self, test_cases: List) -> List:
+        """抽取本代的小批量用例 (不放回，等概率)；weight 为 0 的用例不参与"""
+        cases = [tc for tc in test_cases if tc.weight > 0]
+        if len(cases) <= self.batch_size:
+            return cases
+
+        if self.stratify is None:
+            return random.sample(cases, self.batch_size)
+
+        strata: Dict[Hashable, List] = defaultdict(list)
+        for tc in cases:
+            strata[self.stratify(tc)].append(tc)
+
+        batch = []
+        for stratum, k in _allocate(strata, self.batch_size).items():
+            batch.extend(random.sample(strata[stratum], k))
+        return batch
+
+    def evaluate(self, spore, variants: List, test_cases: List):
+        """在本代小批量上评估种群，适应度取所有已评估用例的加权均值"""
+        spore.evaluate_cases(variants, self.sample(test_cases), test_cases)
+
+
+def _allocate(strata: Dict[Hashable, List], batch_size: int) -> Dict[Hashable, int]:
+    """按各层用例数分配名额 (比例分层，最大余数法)，名额足够时每层至少 1 个"""
+    totals = {s: len(cases) for s, cases in strata.items()}
+    grand_total = sum(totals.values())
+    floor_each = 1 if batch_size >= len(strata) else 0
+
+    quotas = {s: batch_size * totals[s] / grand_total for s in strata}
+    alloc = {s: min(len(strata[s]), max(floor_each, int(quotas[s]))) for s in strata}
+
+    remaining = batch_size - sum(alloc.values())
+    while remaining < 0:
+        largest = max(alloc, key=alloc.get)
+        alloc[largest] -= 1
+        remaining += 1
+    by_remainder = sorted(strata, key=lambda s: quotas[s] - int(quotas[s]), reverse=True)
+    while remaining > 0:
+        progressed = False
+        for s in by_remainder:
+            if remaining > 0 and alloc[s] < len(strata[s]):
+                alloc[s] += 1
+                remaining -= 1
+                progressed = True
+        if not progressed:
+            break
+    return alloc
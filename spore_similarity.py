@@ -0,0 +1,141 @@
+"""
+Spore Similarity - 近重复检测
+字符 n-gram 上的 MinHash + LSH 分桶索引，以及 SimHash 指纹
+"""
+
+import hashlib
+from dataclasses import dataclass
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+_MASK64 = (1 << 64) - 1
+
+
+def shingles(text: str, n: int = 3) -> List[str]:
+    """字符 n-gram (对中文和英文都适用)；空白归一化后计算"""
+    text = " ".join(text.split())
+    if len(text) <= n:
+        return [text]
+    return [text[i:i + n] for i in range(len(text) - n + 1)]
+
+
+def _hash64(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(text: str, n: int = 3, weights: Optional[Dict[str, float]] = None) -> int:
+    """64 位 SimHash 指纹；相似文本的指纹汉明距离小"""
+    grams = shingles(text, n)
+    hashes = np.fromiter((_hash64(g) for g in grams), dtype=np.uint64, count=len(grams))
+    bits = ((hashes[:, None] >> np.arange(64, dtype=np.uint64)) & np.uint64(1)).astype(np.int8)
+    w = np.ones(len(grams)) if weights is None else np.array([weights.get(g, 1.0) for g in grams])
+    votes = ((bits * 2 - 1) * w[:, None]).sum(axis=0)
+    return int(sum(1 << i for i in np.flatnonzero(votes > 0)))
+
+
+def hamming(a: int, b: int) -> int:
+    return bin((a ^ b) & _MASK64).count("1")
+
+
+class MinHasher:
+    """
+    MinHash 签名 (multiply-shift 哈希族)
+
+    两段文本签名相同位置的比例是其 n-gram 集合 Jaccard 相似度的无偏估计。
+    """
+
+    def __init__(self, num_perm: int = 64, ngram: int = 3, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.ngram = ngram
+        self._a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        grams = set(shingles(text, self.ngram))
+        x = np.fromiter((_hash64(g) for g in grams), dtype=np.uint64, count=len(grams))
+        with np.errstate(over="ignore"):
+            h = (x[:, None] * self._a[None, :] + self._b[None, :]) >> np.uint64(32)
+        return h.min(axis=0)
+
+
+def jaccard(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    """由 MinHash 签名估计 Jaccard 相似度"""
+    return float(np.mean(sig_a == sig_b))
+
+
+class NearDuplicateIndex:
+    """
+    近重复索引 - MinHash 签名按 LSH 分桶，只与同桶候选比较
+
+    bands × rows = num_perm；相似度 s 的文本成为候选的概率约为 1 - (1 - s^rows)^bands，
+    候选再用签名估计的相似度与 threshold 比较。
+
+    使用:
+        index = NearDuplicateIndex(threshold=0.9)
+        index.add(1, "你是一个助手。", value=0.8)
+        index.query("你是一个助手!")   # → (1, 0.92, 0.8)
+    """
+
+    def __init__(self, threshold: float = 0.9, num_perm: int = 64, bands: int = 16, ngram: int = 3, seed: int = 0):
+        if num_perm % bands:
+            raise ValueError("num_perm 必须能被 bands 整除")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm, ngram, seed)
+
+        self._signatures: Dict[Hashable, np.ndarray] = {}
+        self._values: Dict[Hashable, object] = {}
+        self._buckets: List[Dict[bytes, List[Hashable]]] = [{} for _ in range(bands)]
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add(self, key: Hashable, text: str, value=None, signature: Optional[np.ndarray] = None):
+        """加入索引；key 已存在时只更新 value"""
+        if key in self._signatures:
+            self._values[key] = value
+            return
+        signature = self.hasher.signature(text) if signature is None else signature
+        self._signatures[key] = signature
+        self._values[key] = value
+        for band, band_key in zip(self._buckets, self._band_keys(signature)):
+            band.setdefault(band_key, []).append(key)
+
+    def query(self, text: str, signature: Optional[np.ndarray] = None) -> Optional[Tuple[Hashable, float, object]]:
+        """返回最相似且不低于 threshold 的 (key, 相似度, value)，没有则 None"""
+        signature = self.hasher.signature(text) if signature is None else signature
+        candidates = set()
+        for band, band_key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(band.get(band_key, ()))
+
+        best = None
+        for key in candidates:
+            similarity = jaccard(signature, self._signatures[key])
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (key, similarity, self._values[key])
+        return best
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._signatures
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+
+@dataclass
+class DedupConfig:
+    """
+    近重复处理配置
+
+    threshold: 估计 Jaccard 相似度不低于此值视为近重复
+    action: "inherit" 直接沿用已评估近似个体的适应度；
+            "regenerate" 丢弃后从同一父代重新变异 (最多 max_regenerate 次，仍重复则沿用适应度)
+    """
+    threshold: float = 0.95
+    action: str = "inherit"
+    max_regenerate: int = 2
+    num_perm: int = 64
+    bands: int = 16
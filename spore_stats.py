@@ -0,0 +1,123 @@
+"""
+Spore Stats - 增量进化统计
+每代记录一次，读取统计为常数时间
+"""
+
+import math
+from dataclasses import dataclass, asdict
+from typing import Dict, Iterable, List, Optional
+
+
+@dataclass
+class GenerationStats:
+    """单代统计"""
+    generation: int
+    count: int
+    best: float
+    mean: float
+    variance: float
+    best_so_far: float
+    improvement: float        # best_so_far - 种子适应度
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class EvolutionStats:
+    """
+    进化统计的运行聚合
+
+    使用:
+        stats = EvolutionStats()
+        stats.record_generation(fitnesses, seed_fitness=...)
+        stats.summary()        # O(1)
+        stats.series           # 每代一条 GenerationStats
+    """
+
+    def __init__(self):
+        self.series: List[GenerationStats] = []
+        self.seed_fitness: Optional[float] = None
+        self.best_so_far = float("-inf")
+
+        # 全部样本的 Welford 累积量
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def record_generation(self, fitnesses: Iterable[float], seed_fitness: Optional[float] = None) -> GenerationStats:
+        """记录一代种群的适应度"""
+        if self.seed_fitness is None and seed_fitness is not None:
+            self.seed_fitness = seed_fitness
+
+        count, mean, m2, best = 0, 0.0, 0.0, float("-inf")
+        for f in fitnesses:
+            count += 1
+            delta = f - mean
+            mean += delta / count
+            m2 += delta * (f - mean)
+            best = max(best, f)
+
+            # 合并进全局累积量
+            self._count += 1
+            g_delta = f - self._mean
+            self._mean += g_delta / self._count
+            self._m2 += g_delta * (f - self._mean)
+
+        if count:
+            self.best_so_far = max(self.best_so_far, best)
+
+        entry = GenerationStats(
+            generation=len(self.series),
+            count=count,
+            best=best if count else math.nan,
+            mean=mean if count else math.nan,
+            variance=m2 / count if count else math.nan,
+            best_so_far=self.best_so_far,
+            improvement=self.improvement,
+        )
+        self.series.append(entry)
+        return entry
+
+    @property
+    def improvement(self) -> float:
+        if self.seed_fitness is None or self._count == 0:
+            return 0.0
+        return self.best_so_far - self.seed_fitness
+
+    @property
+    def mean(self) -> float:
+        return self._mean
+
+    @property
+    def variance(self) -> float:
+        return self._m2 / self._count if self._count else 0.0
+
+    def to_state(self) -> Dict:
+        return {
+            "seed_fitness": self.seed_fitness,
+            "best_so_far": self.best_so_far,
+            "count": self._count,
+            "mean": self._mean,
+            "m2": self._m2,
+        }
+
+    def restore(self, state: Dict, series: List[Dict]):
+        self.seed_fitness = state["seed_fitness"]
+        self.best_so_far = state["best_so_far"]
+        self._count = state["count"]
+        self._mean = state["mean"]
+        self._m2 = state["m2"]
+        self.series = [GenerationStats(**entry) for entry in series]
+
+    def summary(self) -> Dict:
+        if not self.series:
+            return {}
+        return {
+            "generations": len(self.series),
+            "evaluations": self._count,
+            "best_fitness": self.best_so_far,
+            "avg_fitness": self._mean,
+            "fitness_variance": self.variance,
+            "seed_fitness": self.seed_fitness,
+            "improvement": self.improvement,
+        }
@@ -0,0 +1,184 @@
+"""
+Spore Surrogate - 本地代理适应度模型
+字符 n-gram TF-IDF 特征 + 岭回归，按历史 (提示词, 适应度) 在线训练，用于评估前筛选候选
+"""
+
+import hashlib
+import math
+import random
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+def _content_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class HashingFeaturizer:
+    """
+    字符 n-gram 哈希到固定维度，次线性 TF × IDF，L2 归一化
+
+    每个文本的 TF 行 (稀疏) 按内容哈希缓存: 历史每代只增加少量新提示词，
+    重新训练时只需对新文本做 n-gram 哈希，再重算 IDF。缓存在 fit_transform 时
+    裁剪为本次训练集，之后 transform 的候选在下一次训练前暂存。
+    """
+
+    def __init__(self, ngram: Tuple[int, int] = (2, 4), dim: int = 4096):
+        self.ngram = ngram
+        self.dim = dim
+        self.idf = np.ones(dim)
+        self._rows: Dict[bytes, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def _counts(self, text: str) -> Dict[int, int]:
+        text = " ".join(text.split())
+        counts: Dict[int, int] = {}
+        for n in range(self.ngram[0], self.ngram[1] + 1):
+            for i in range(len(text) - n + 1):
+                h = int.from_bytes(hashlib.blake2b(text[i:i + n].encode("utf-8"), digest_size=4).digest(), "big")
+                bucket = h % self.dim
+                counts[bucket] = counts.get(bucket, 0) + 1
+        return counts
+
+    def _row(self, key: bytes, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(桶下标, 次线性 TF) 稀疏行，按内容哈希缓存"""
+        row = self._rows.get(key)
+        if row is None:
+            counts = self._counts(text)
+            buckets = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+            tf = 1.0 + np.log(np.fromiter(counts.values(), dtype=float, count=len(counts)))
+            row = self._rows[key] = (buckets, tf)
+        return row
+
+    def _tf(self, texts: List[str], keys: Optional[List[bytes]] = None) -> np.ndarray:
+        keys = keys or [_content_key(text) for text in texts]
+        X = np.zeros((len(texts), self.dim))
+        for i, (key, text) in enumerate(zip(keys, texts)):
+            buckets, tf = self._row(key, text)
+            X[i, buckets] = tf
+        return X
+
+    def fit_transform(self, texts: List[str]) -> np.ndarray:
+        keys = [_content_key(text) for text in texts]
+        X = self._tf(texts, keys)
+        self._rows = {key: self._rows[key] for key in keys}
+        df = np.count_nonzero(X, axis=0)
+        self.idf = np.log((1 + len(texts)) / (1 + df)) + 1.0
+        return self._normalize(X * self.idf)
+
+    def transform(self, texts: List[str]) -> np.ndarray:
+        return self._normalize(self._tf(texts) * self.idf)
+
+    @staticmethod
+    def _normalize(X: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(X, axis=1, keepdims=True)
+        return X / np.where(norms > 0, norms, 1.0)
+
+
+def spearman(a: np.ndarray, b: np.ndarray) -> float:
+    """秩相关系数 (不处理并列)"""
+    if len(a) < 2:
+        return float("nan")
+    ra = np.argsort(np.argsort(a)).astype(float)
+    rb = np.argsort(np.argsort(b)).astype(float)
+    ra -= ra.mean()
+    rb -= rb.mean()
+    denom = math.sqrt(float((ra ** 2).sum() * (rb ** 2).sum()))
+    return float((ra * rb).sum() / denom) if denom > 0 else float("nan")
+
+
+@dataclass
+class SurrogateConfig:
+    """
+    代理模型配置
+
+    oversample: 每需要 1 个变异子代就生成 oversample 个候选，只把预测最高的送去真实评估
+    min_samples: 历史中已评估的不同提示词达到此数后才开始筛选
+    exploration: 保留名额中随机挑选的比例，避免模型偏见自我强化
+    alpha: 岭回归正则强度
+    max_samples: 训练只使用最近的 max_samples 条
+    """
+    oversample: float = 3.0
+    min_samples: int = 20
+    exploration: float = 0.2
+    alpha: float = 1.0
+    max_samples: int = 2000
+    ngram: Tuple[int, int] = (2, 4)
+    dim: int = 4096
+
+
+class FitnessSurrogate:
+    """
+    在线训练的代理适应度模型 (对偶形式的核岭回归，样本数远小于特征维度时更快)
+
+    accuracy 记录每代筛选预测与真实评估结果的对比 (MAE、秩相关)。
+    """
+
+    def __init__(self, config: Optional[SurrogateConfig] = None):
+        self.config = config or SurrogateConfig()
+        self.featurizer = HashingFeaturizer(self.config.ngram, self.config.dim)
+        self.num_samples = 0
+        self.accuracy: List[Dict] = []
+
+        self._X: Optional[np.ndarray] = None
+        self._coef: Optional[np.ndarray] = None
+        self._mean = 0.0
+        self._pending: Dict[str, float] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self._coef is not None and self.num_samples >= self.config.min_samples
+
+    def fit(self, pairs: Iterable[Tuple[str, float]]):
+        """用 (提示词, 适应度) 训练；相同提示词取均值"""
+        by_text: Dict[str, List[float]] = {}
+        for text, fitness in pairs:
+            by_text.setdefault(text, []).append(fitness)
+        texts = list(by_text)[-self.config.max_samples:]
+        if len(texts) < 2:
+            return
+        y = np.array([float(np.mean(by_text[t])) for t in texts])
+
+        X = self.featurizer.fit_transform(texts)
+        self._mean = float(y.mean())
+        K = X @ X.T
+        self._coef = np.linalg.solve(K + self.config.alpha * np.eye(len(texts)), y - self._mean)
+        self._X = X
+        self.num_samples = len(texts)
+
+    def predict(self, texts: List[str]) -> np.ndarray:
+        if self._coef is None:
+            return np.full(len(texts), self._mean)
+        return self.featurizer.transform(texts) @ self._X.T @ self._coef + self._mean
+
+    def select(self, texts: List[str], keep: int) -> List[int]:
+        """挑出要真实评估的候选下标: 预测最高者 + 少量随机探索"""
+        predictions = self.predict(texts)
+        order = [int(i) for i in np.argsort(-predictions, kind="stable")]
+        explore = min(int(round(keep * self.config.exploration)), max(0, len(texts) - keep))
+        chosen = order[:keep - explore]
+        if explore:
+            chosen += random.sample(order[keep - explore:], explore)
+        for i in chosen:
+            self._pending[texts[i]] = float(predictions[i])
+        return chosen
+
+    def observe(self, variants: List, generation: int) -> Optional[Dict]:
+        """用真实评估结果检验上一轮筛选时的预测，记录精度"""
+        pairs = [(self._pending.pop(v.content), v.fitness) for v in variants
+                 if v.evaluated and v.content in self._pending]
+        self._pending.clear()
+        if not pairs:
+            return None
+        predicted = np.array([p for p, _ in pairs])
+        actual = np.array([a for _, a in pairs])
+        record = {
+            "generation": generation,
+            "count": len(pairs),
+            "mae": float(np.abs(predicted - actual).mean()),
+            "spearman": spearman(predicted, actual),
+            "train_size": self.num_samples,
+        }
+        self.accuracy.append(record)
+        return record
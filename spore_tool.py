@@ -6,6 +6,8 @@ Spore Tool - Agent 可调用的进化工具
 from typing import Optional, List
 import json
 
+from spore_llm import LLMResponseCache, as_llm_client
+
 
 # Tool 定义 - 可以被 agent 直接调用
 SPORE_TOOL_SCHEMA = {
@@ -46,20 +48,29 @@ SPORE_TOOL_SCHEMA = {
 }
 
 
-def create_spore_tool(llm_client):
+def create_spore_tool(
+    llm_client,
+    cache: Optional[LLMResponseCache] = None,
+    model: Optional[str] = None
+):
     """
     创建可调用的 spore tool
     
     使用:
-        tool = create_spore_tool(openai_client)
+        tool = create_spore_tool(openai_client, model="gpt-4")
         result = tool(
             gene_type="system_prompt",
             current_gene="你是一个助手...",
             feedback="任务失败了，因为...",
             goal="更强大的推理能力"
         )
+    
+    cache: LLM 响应缓存 (见 spore_llm)；未指定时使用内存缓存
+    model: OpenAI 兼容客户端必须指定；chat(prompt) 客户端可省略
     """
     
+    llm = as_llm_client(llm_client, cache if cache is not None else LLMResponseCache(), model)
+    
     def spore_evolve(
         gene_type: str,
         current_gene: str,
@@ -100,7 +111,7 @@ def create_spore_tool(llm_client):
 
 请直接输出进化后的内容，不要解释:"""
         
-        response = llm_client.chat(evolution_prompt)
+        response = llm.chat(evolution_prompt)
         
         return json.dumps({
             "success": True,